@@ -0,0 +1,377 @@
+"""
+Local stand-ins for Gmail REST, Microsoft Graph and a Telethon event source.
+
+Every fake mailbox / chat receives `rate` messages per second from the moment the
+fakes start. Message i of a mailbox "arrives" at start + (i + 1) / rate, so nothing has to
+be generated ahead of time and the arrival time travels with the message
+(internalDate / receivedDateTime / date) for source-to-render latency.
+"""
+import json
+import time
+import random
+import asyncio
+import multiprocessing
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs, unquote
+from aiohttp import web
+
+
+class FakeConfig:
+    def __init__(self, rate=5.0, latency=0.05, jitter=0.02, error_rate=0.0, retry_after=1):
+        self.rate = rate                # messages per second per mailbox / chat
+        self.latency = latency          # seconds added to every request
+        self.jitter = jitter            # +/- seconds of random latency
+        self.error_rate = error_rate    # fraction of requests (and batch items) that are throttled
+        self.retry_after = retry_after  # Retry-After sent with throttling errors
+
+
+class FakeMailbox:
+    """Arrival schedule of one mailbox / chat: message i arrives at start + (i + 1) / rate."""
+
+    def __init__(self, key, rate, start):
+        self.key = key
+        self.rate = rate
+        self.start = start
+
+    def arrived(self, now=None):
+        """How many messages have arrived so far."""
+        return max(0, int(((now or time.time()) - self.start) * self.rate))
+
+    def arrival_time(self, i):
+        return self.start + (i + 1) / self.rate
+
+    def message_id(self, i):
+        return f"{self.key}-{i:08x}"
+
+    @staticmethod
+    def index_of(message_id):
+        return int(message_id.rsplit("-", 1)[1], 16)
+
+
+class FakeService:
+    """Shared plumbing: latency, throttling and per-account mailboxes."""
+
+    def __init__(self, config, start):
+        self.config = config
+        self.start = start
+        self.mailboxes = {}
+        self.requests = 0
+        self.throttled = 0
+
+    def mailbox(self, key):
+        if key not in self.mailboxes:
+            self.mailboxes[key] = FakeMailbox(key, self.config.rate, self.start)
+        return self.mailboxes[key]
+
+    @staticmethod
+    def account_from(request):
+        return request.headers.get("Authorization", "").removeprefix("Bearer fake-")
+
+    def throttle(self):
+        """True when this request / batch item should fail with a throttling error."""
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            self.throttled += 1
+            return True
+        return False
+
+    async def delay(self):
+        self.requests += 1
+        latency = self.config.latency + random.uniform(-self.config.jitter, self.config.jitter)
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+
+# ===== GMAIL =====
+class FakeGmail(FakeService):
+    """
+    /gmail/v1/users/me/{profile,history,messages} and the multipart /batch/gmail/v1 endpoint.
+    The account is taken from the bearer token ("fake-<account>"); historyId = messages arrived.
+    """
+
+    HISTORY_PAGE = 100
+
+    def routes(self):
+        return [
+            web.get("/gmail/v1/users/me/profile", self.profile),
+            web.get("/gmail/v1/users/me/history", self.history),
+            web.get("/gmail/v1/users/me/messages", self.list_messages),
+            web.post("/batch/gmail/v1", self.batch),
+        ]
+
+    def throttled_response(self):
+        return web.json_response(
+            {"error": {"code": 429, "message": "Rate Limit Exceeded", "errors": [{"reason": "rateLimitExceeded"}]}},
+            status=429, headers={"Retry-After": str(self.config.retry_after)}
+        )
+
+    def metadata(self, mailbox, i):
+        return {
+            "id": mailbox.message_id(i),
+            "labelIds": ["UNREAD", "INBOX", "CATEGORY_PERSONAL"],
+            "snippet": f"Benchmark message {i} for {mailbox.key}",
+            "internalDate": str(int(mailbox.arrival_time(i) * 1000)),
+            "payload": {"headers": [
+                {"name": "Subject", "value": f"Load test #{i}"},
+                {"name": "From", "value": f"Sender {i % 50} <sender{i % 50}@example.com>"},
+            ]},
+        }
+
+    async def profile(self, request):
+        await self.delay()
+        if self.throttle():
+            return self.throttled_response()
+        mailbox = self.mailbox(self.account_from(request))
+        return web.json_response({"emailAddress": mailbox.key, "historyId": str(mailbox.arrived())})
+
+    async def history(self, request):
+        await self.delay()
+        if self.throttle():
+            return self.throttled_response()
+        mailbox = self.mailbox(self.account_from(request))
+        start = int(request.query.get("pageToken") or request.query["startHistoryId"])
+        latest = mailbox.arrived()
+        end = min(latest, start + self.HISTORY_PAGE)
+        response = {
+            "history": [
+                {"id": str(i + 1), "messagesAdded": [{"message": {
+                    "id": mailbox.message_id(i), "labelIds": ["UNREAD", "INBOX", "CATEGORY_PERSONAL"]
+                }}]}
+                for i in range(start, end)
+            ],
+            "historyId": str(latest),
+        }
+        if end < latest:
+            response["nextPageToken"] = str(end)
+        return web.json_response(response)
+
+    async def list_messages(self, request):
+        await self.delay()
+        if self.throttle():
+            return self.throttled_response()
+        mailbox = self.mailbox(self.account_from(request))
+        latest = mailbox.arrived()
+        count = min(latest, int(request.query.get("maxResults", 100)))
+        return web.json_response({"messages": [{"id": mailbox.message_id(i)} for i in range(latest - 1, latest - 1 - count, -1)]})
+
+    async def batch(self, request):
+        await self.delay()
+        if self.throttle():
+            return self.throttled_response()
+        mailbox = self.mailbox(self.account_from(request))
+        content_type = request.headers.get("Content-Type", "")
+        boundary = content_type.split("boundary=", 1)[1].strip('"')
+        body = await request.text()
+
+        out_boundary = f"batch_response_{random.getrandbits(32):08x}"
+        parts = []
+        for raw in body.split(f"--{boundary}"):
+            if "Content-ID:" not in raw:
+                continue
+            content_id = raw.split("Content-ID:", 1)[1].split("\n", 1)[0].strip().strip("<>")
+            msg_id = raw.split("/messages/", 1)[1].split("?", 1)[0]
+            if self.throttle():
+                status, payload = "429 Too Many Requests", {"error": {"code": 429, "message": "Rate Limit Exceeded"}}
+            else:
+                status, payload = "200 OK", self.metadata(mailbox, FakeMailbox.index_of(msg_id))
+            parts.append(
+                f"--{out_boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        return web.Response(
+            text="".join(parts) + f"--{out_boundary}--",
+            headers={"Content-Type": f"multipart/mixed; boundary={out_boundary}"}
+        )
+
+
+# ===== MICROSOFT GRAPH =====
+class FakeGraph(FakeService):
+    """
+    /v1.0/$batch carrying messages/delta requests for /me and /users/{address}.
+    Delta/skip tokens are simply the index of the next message to deliver.
+    """
+
+    def __init__(self, config, start, base_url=""):
+        super().__init__(config, start)
+        self.base_url = base_url
+
+    def routes(self):
+        return [web.post("/v1.0/$batch", self.batch)]
+
+    def resource(self, mailbox, i):
+        received = datetime.fromtimestamp(mailbox.arrival_time(i), timezone.utc)
+        return {
+            "id": mailbox.message_id(i),
+            "subject": f"Load test #{i}",
+            "from": {"emailAddress": {"name": f"Sender {i % 50}", "address": f"sender{i % 50}@example.com"}},
+            "receivedDateTime": received.isoformat(timespec="microseconds").replace("+00:00", "Z"),
+            "isRead": False,
+        }
+
+    def delta_page(self, signin, url, page_size):
+        parts = urlsplit(url)
+        path = parts.path
+        address = signin if path.startswith("/me/") else unquote(path.split("/")[2])
+        mailbox = self.mailbox(address)
+        query = parse_qs(parts.query)
+        start = int((query.get("$skiptoken") or query.get("$deltatoken") or ["0"])[0])
+        latest = mailbox.arrived()
+        end = min(latest, start + page_size)
+        body = {"value": [self.resource(mailbox, i) for i in range(start, end)]}
+        if end < latest:
+            body["@odata.nextLink"] = f"{self.base_url}/v1.0{path}?$skiptoken={end}"
+        else:
+            body["@odata.deltaLink"] = f"{self.base_url}/v1.0{path}?$deltatoken={end}"
+        return body
+
+    async def batch(self, request):
+        await self.delay()
+        if self.throttle():
+            return web.json_response({"error": {"code": "TooManyRequests"}}, status=429,
+                                     headers={"Retry-After": str(self.config.retry_after)})
+        signin = self.account_from(request)
+        responses = []
+        for item in (await request.json())["requests"]:
+            if self.throttle():
+                responses.append({"id": item["id"], "status": 429,
+                                  "headers": {"Retry-After": str(self.config.retry_after)}, "body": {}})
+                continue
+            prefer = item.get("headers", {}).get("Prefer", "odata.maxpagesize=10")
+            page_size = int(prefer.split("=", 1)[1])
+            responses.append({"id": item["id"], "status": 200, "body": self.delta_page(signin, item["url"], page_size)})
+        return web.json_response({"responses": responses})
+
+
+class FakeTokenManager:
+    """Stands in for OutlookTokenManager: the token names the signed-in mailbox."""
+
+    async def get_token_async(self, username=None):
+        return {"access_token": f"fake-{username}", "id_token_claims": {"preferred_username": username}}
+
+
+# ===== SERVER PROCESS =====
+@web.middleware
+async def ignore_disconnects(request, handler):
+    """Polls cancelled at the end of a run drop their connection mid-request; that is expected."""
+    try:
+        return await handler(request)
+    except ConnectionResetError:
+        return web.Response(status=499)
+
+
+def serve(config, start, conn):
+    """Run the Gmail and Graph fakes on one local port (child process entry point)."""
+    async def run():
+        app = web.Application(client_max_size=16 * 1024 ** 2, middlewares=[ignore_disconnects])
+        gmail = FakeGmail(config, start)
+        graph = FakeGraph(config, start)
+        app.add_routes(gmail.routes() + graph.routes())
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        graph.base_url = f"http://127.0.0.1:{port}"
+        conn.send(port)
+        # Parent sends anything to stop; reply with request counts
+        await asyncio.to_thread(conn.recv)
+        conn.send({
+            "gmail_requests": gmail.requests, "gmail_throttled": gmail.throttled,
+            "graph_requests": graph.requests, "graph_throttled": graph.throttled,
+        })
+        await runner.cleanup()
+
+    asyncio.run(run())
+
+
+class FakeServers:
+    """Gmail + Graph fakes in a child process, so they do not compete with the aggregator's event loop."""
+
+    def __init__(self, config, start):
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=serve, args=(config, start, child_conn), daemon=True)
+        self._process.start()
+        self.base_url = f"http://127.0.0.1:{self._conn.recv()}"
+
+    def stop(self):
+        self._conn.send("stop")
+        stats = self._conn.recv()
+        self._process.join(5)
+        return stats
+
+
+# ===== TELEGRAM =====
+class FakeSender:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.username = f"user{user_id}"
+
+
+class FakeTelegramMessage:
+    """The Message attributes the handler and SenderCache read."""
+
+    def __init__(self, msg_id, text, date, sender_id, config):
+        self.id = msg_id
+        self.text = text
+        self.date = date
+        self.sender_id = sender_id
+        self.sender = None  # entity not shipped with the update: forces a get_sender lookup on cache miss
+        self._config = config
+
+    async def get_sender(self):
+        latency = self._config.latency + random.uniform(-self._config.jitter, self._config.jitter)
+        if latency > 0:
+            await asyncio.sleep(latency)
+        return FakeSender(self.sender_id)
+
+
+class FakeNewMessageEvent:
+    def __init__(self, chat_id, message):
+        self.chat_id = chat_id
+        self.message = message
+
+
+class FakeTelegramSource:
+    """
+    Fires NewMessage events at a handler the way Telethon does: one task per update,
+    handler exceptions are counted and swallowed.
+    """
+
+    def __init__(self, handler, chat_ids, config, start, senders=200):
+        self.handler = handler
+        self.chats = [FakeMailbox(str(chat_id), config.rate, start) for chat_id in chat_ids]
+        self.config = config
+        self.senders = senders
+        self.delivered = 0
+        self.errors = 0
+        self._tasks = set()
+
+    async def _dispatch(self, event):
+        try:
+            await self.handler(event)
+        except Exception:
+            self.errors += 1
+
+    def _fire(self, chat, i):
+        message = FakeTelegramMessage(
+            i + 1, f"Benchmark message {i} in chat {chat.key}",
+            datetime.fromtimestamp(chat.arrival_time(i), timezone.utc),
+            1000 + random.randrange(self.senders), self.config
+        )
+        task = asyncio.create_task(self._dispatch(FakeNewMessageEvent(int(chat.key), message)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self.delivered += 1
+
+    async def run(self, duration):
+        sent = {chat.key: 0 for chat in self.chats}
+        deadline = time.time() + duration
+        while time.time() < deadline:
+            now = time.time()
+            for chat in self.chats:
+                for i in range(sent[chat.key], chat.arrived(now)):
+                    self._fire(chat, i)
+                sent[chat.key] = chat.arrived(now)
+            await asyncio.sleep(0.005)
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
@@ -0,0 +1,138 @@
+"""
+Render micro-benchmark: messages/sec through the old rich path (Text renderables +
+console.print per message, as display_message did before RenderEngine) versus the
+precompiled RenderEngine, one message at a time and in RenderQueue-sized batches.
+
+    python -m benchmarks.render --messages 20000 --width 160
+
+Output goes to /dev/null through a truecolor console, so only formatting and
+terminal-write cost is measured. Also times sender parsing with and without the cache.
+"""
+import os
+import time
+import random
+import argparse
+from rich.console import Console
+from rich.table import Table
+from rich.text import Text
+
+from display.terminal_display import RenderEngine, SERVICE_COLORS, CONTENT_COLORS
+from pipeline.message import FeedMessage, parse_sender
+
+BATCH_SIZE = 50  # RenderQueue.DEFAULT_BATCH_SIZE
+
+
+def legacy_render_message(message):
+    """render_message as it was before RenderEngine (padded to 120 columns, separate separator)."""
+    service_name = message.source
+    sender_detail = message.sender_address or (str(message.chat_id) if message.chat_id is not None else "N/A")
+    display_time = message.display_time()
+    service_color = SERVICE_COLORS.get(service_name, "green")
+    content_colors = CONTENT_COLORS.get(service_name, CONTENT_COLORS["GMAIL"])
+    MAX_MSG_WIDTH = 120
+
+    line = Text()
+    line.append(f"[{service_name}] ", style=f"bold {service_color}")
+    if message.is_email:
+        if display_time:
+            line.append(f"Email Acct: {message.account} [", style="bold bright_magenta")
+            line.append(display_time, style="bold white")
+            line.append("]\n", style="bold bright_magenta")
+        else:
+            line.append(f"Email Acct: {message.account}\n", style="bold bright_magenta")
+
+    main_msg = Text()
+    main_msg.append(message.sender_name, style=content_colors["field1"])
+    if sender_detail:
+        main_msg.append(f" <{sender_detail}>", style=content_colors["field2"])
+    main_msg.append("  >>  ")
+    main_msg.append(message.content, style=content_colors["field3"])
+    msg_len = len(main_msg.plain)
+    if msg_len < MAX_MSG_WIDTH:
+        main_msg.append(" " * (MAX_MSG_WIDTH - msg_len))
+    line.append(main_msg)
+    return line, Text("-" * 120, style="dim green")
+
+
+def make_messages(count, telegram_share=0.8, senders=200, seed=1):
+    """A Telegram-heavy flood with a realistic amount of repeated senders."""
+    rng = random.Random(seed)
+    now = time.time()
+    raw_senders = [f"Sender {i} <sender{i}@example.com>" for i in range(senders)]
+    messages = []
+    for i in range(count):
+        if rng.random() < telegram_share:
+            messages.append(FeedMessage("TELEGRAM", i, f"user{rng.randrange(senders)}", chat_id=-100_123_456,
+                                        text=" ".join(rng.choice(("deal", "price", "update", "gm", "ok")) for _ in range(rng.randint(3, 25))),
+                                        timestamp=now))
+        else:
+            messages.append(FeedMessage.from_raw_sender(rng.choice(("GMAIL", "OUTLOOK")), str(i), rng.choice(raw_senders),
+                                                        subject=f"Weekly report #{i}", account="me@example.com",
+                                                        timestamp=now))
+    return messages, [rng.choice(raw_senders) for _ in range(count)]
+
+
+def rate(fn, items):
+    started = time.perf_counter()
+    fn(items)
+    return len(items) / (time.perf_counter() - started)
+
+
+def batches(items):
+    return [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render micro-benchmark (old rich path vs RenderEngine).")
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--width", type=int, default=160, help="terminal width to render for")
+    args = parser.parse_args()
+
+    messages, raw_senders = make_messages(args.messages)
+    with open(os.devnull, "w") as devnull:
+        target = Console(file=devnull, force_terminal=True, color_system="truecolor", width=args.width)
+        engine = RenderEngine(target)
+
+        def legacy_each(items):
+            for message in items:
+                target.print(*legacy_render_message(message), sep="\n")
+
+        def legacy_batched(items):
+            for batch in batches(items):
+                with target:
+                    for message in batch:
+                        target.print(*legacy_render_message(message), sep="\n")
+
+        def engine_each(items):
+            for message in items:
+                engine.write([message])
+
+        def engine_batched(items):
+            for batch in batches(items):
+                engine.write(batch)
+
+        results = [
+            ("rich Text + console.print (old display_message)", rate(legacy_each, messages)),
+            (f"rich, batched by {BATCH_SIZE} (old RenderQueue)", rate(legacy_batched, messages)),
+            ("RenderEngine, one write per message", rate(engine_each, messages)),
+            (f"RenderEngine, one write per {BATCH_SIZE}", rate(engine_batched, messages)),
+        ]
+
+    parse_sender.cache_clear()
+    uncached = rate(lambda items: [parse_sender.__wrapped__(raw) for raw in items], raw_senders)
+    cached = rate(lambda items: [parse_sender(raw) for raw in items], raw_senders)
+
+    table = Table(title=f"Rendering {args.messages} messages at {args.width} columns")
+    table.add_column("path")
+    table.add_column("msgs/s", justify="right")
+    table.add_column("vs old", justify="right")
+    baseline = results[0][1]
+    for name, per_second in results:
+        table.add_row(name, f"{per_second:,.0f}", f"{per_second / baseline:.1f}x")
+    table.add_row("parse_sender (regex every time)", f"{uncached:,.0f}", "")
+    table.add_row("parse_sender (lru_cache)", f"{cached:,.0f}", f"{cached / uncached:.1f}x")
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Offline load benchmark: the real connectors, scheduler and display pipeline against
+the local fakes in benchmarks/fakes.py.
+
+    python -m benchmarks.run --gmail-accounts 5 --outlook-accounts 5 --telegram-chats 10 --rate 20 --duration 30
+
+Reports throughput, ingest-to-render and source-to-render latency percentiles per
+source, render cost and memory. Nothing touches the network, auth/ or data/.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+try:
+    import resource  # POSIX only; peak RSS is not reported on Windows
+except ImportError:
+    resource = None
+from rich.console import Console
+from rich.table import Table
+
+import connectors.gmail_connector as gmail_connector
+import connectors.outlook_connector as outlook_connector
+from google.oauth2.credentials import Credentials
+from connectors.gmail_connector import GmailClient, poll_new_emails
+from connectors.outlook_connector import poll_outlook_account
+from connectors.http_client import create_http_session
+from connectors.telegram_connector import make_message_handler, SenderCache
+from display import terminal_display
+from display.render_queue import RenderQueue
+from pipeline.event_channel import EventChannel
+from pipeline.filters import MessageFilter, DEFAULT_RULES
+from pipeline.ingest import Ingest
+from pipeline.scheduler import PollScheduler
+from storage.archive import ArchiveWriter
+from storage.search_index import IndexWriter
+from benchmarks.fakes import FakeConfig, FakeServers, FakeTelegramSource, FakeTokenManager
+
+START_DELAY = 1.0   # seconds between launching the fakes and the first arrival
+GRACE_PERIOD = 3.0  # seconds allowed after the run for in-flight polls and renders
+
+
+# ===== INSTRUMENTED STAGES =====
+class IngestClock:
+    """Ingest tap: stamps every message as it enters the pipeline."""
+
+    def __init__(self):
+        self.stamps = {}  # id(message) -> perf_counter at ingest
+        self.ingested = 0
+
+    async def put(self, message):
+        self.stamps[id(message)] = time.perf_counter()
+        self.ingested += 1
+
+
+class TimedRenderQueue(RenderQueue):
+    """RenderQueue that records per-message latency and per-batch render cost."""
+
+    def __init__(self, clock, **kwargs):
+        super().__init__(**kwargs)
+        self.clock = clock
+        self.ingest_latency = {}   # source -> [seconds]
+        self.source_latency = {}   # source -> [seconds]
+        self.render_seconds = []
+
+    def _render(self, batch):
+        started = time.perf_counter()
+        super()._render(batch)
+        finished = time.perf_counter()
+        self.render_seconds.append(finished - started)
+
+        now = time.time()
+        for message in batch:
+            stamped = self.clock.stamps.pop(id(message), None)
+            if stamped is not None:
+                self.ingest_latency.setdefault(message.source, []).append(finished - stamped)
+            if message.timestamp:
+                self.source_latency.setdefault(message.source, []).append(now - message.timestamp)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where `resource` is missing (Windows)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB elsewhere
+
+
+class CountingScheduler(PollScheduler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.polls = 0
+        self.errors = 0
+
+    def _on_success(self, job, new_count):
+        self.polls += 1
+        return super()._on_success(job, new_count)
+
+    def _on_error(self, job, error):
+        self.polls += 1
+        self.errors += 1
+        return super()._on_error(job, error)
+
+
+# ===== TELEGRAM WORKER =====
+def run_telegram_worker(channel, chat_ids, config, start, duration, conn):
+    """Child process, like main.run_telegram: fake events -> real handler -> EventChannel."""
+    async def run():
+        sender_cache = SenderCache()
+        source = FakeTelegramSource(make_message_handler(channel, sender_cache), chat_ids, config, start)
+        await asyncio.sleep(max(0.0, start - time.time()))
+        await source.run(duration)
+        conn.send({
+            "telegram_events": source.delivered, "telegram_handler_errors": source.errors,
+            "sender_cache_hits": sender_cache.hits, "sender_cache_misses": sender_cache.misses,
+        })
+
+    asyncio.run(run())
+
+
+# ===== REPORT =====
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": ordered[-1], "n": len(ordered)}
+
+
+def build_report(args, elapsed, render_queue, clock, scheduler, depth_samples, extra):
+    expected_per_source = {
+        "GMAIL": args.gmail_accounts,
+        "OUTLOOK": args.outlook_accounts * (1 + args.shared_mailboxes),
+        "TELEGRAM": args.telegram_chats,
+    }
+    return {
+        "config": vars(args),
+        "elapsed_s": elapsed,
+        "arrived_estimate": sum(n * args.rate * args.duration for n in expected_per_source.values()),
+        "ingested": clock.ingested,
+        "rendered": render_queue.rendered,
+        "throughput_msgs_per_s": render_queue.rendered / elapsed if elapsed else 0.0,
+        "ingest_to_render_s": {src: percentiles(v) for src, v in render_queue.ingest_latency.items()},
+        "source_to_render_s": {src: percentiles(v) for src, v in render_queue.source_latency.items()},
+        "render_batch_ms": {k: v * 1000 if k != "n" else v for k, v in percentiles(render_queue.render_seconds).items()},
+        "render_batches": render_queue.batches,
+        "queue_high_water": render_queue.high_water,
+        "queue_depth_avg": sum(depth_samples) / len(depth_samples) if depth_samples else 0,
+        "polls": scheduler.polls,
+        "poll_errors": scheduler.errors,
+        "peak_rss_mb": peak_rss_mb(),
+        **extra,
+    }
+
+
+def print_report(report):
+    console = Console()
+    console.print(f"\n📊 Benchmark: {report['rendered']} rendered / {report['ingested']} ingested "
+                  f"(~{int(report['arrived_estimate'])} arrived) in {report['elapsed_s']:.1f}s "
+                  f"→ {report['throughput_msgs_per_s']:.1f} msgs/s", style="bold cyan")
+
+    table = Table(title="Latency (ms)")
+    for column in ("source", "stage", "n", "p50", "p90", "p99", "max"):
+        table.add_column(column, justify="right" if column not in ("source", "stage") else "left")
+    for stage, key in (("ingest→render", "ingest_to_render_s"), ("source→render", "source_to_render_s")):
+        for source, p in sorted(report[key].items()):
+            table.add_row(source, stage, str(p["n"]), *(f"{p[q] * 1000:.1f}" for q in ("p50", "p90", "p99", "max")))
+    console.print(table)
+
+    render = report["render_batch_ms"]
+    if render:
+        console.print(f"Render: {report['render_batches']} batches, p50 {render['p50']:.2f}ms / p99 {render['p99']:.2f}ms per batch")
+    console.print(f"Queue: high water {report['queue_high_water']}, avg depth {report['queue_depth_avg']:.1f}")
+    console.print(f"Polls: {report['polls']} ({report['poll_errors']} errors); "
+                  f"fake Gmail {report.get('gmail_requests', 0)} req ({report.get('gmail_throttled', 0)} throttled), "
+                  f"fake Graph {report.get('graph_requests', 0)} req ({report.get('graph_throttled', 0)} throttled)")
+    if "telegram_events" in report:
+        console.print(f"Telegram: {report['telegram_events']} events, {report['telegram_handler_errors']} handler errors, "
+                      f"sender cache {report['sender_cache_hits']} hits / {report['sender_cache_misses']} misses")
+    if report["peak_rss_mb"] is not None:
+        console.print(f"Memory: peak RSS {report['peak_rss_mb']:.1f} MB")
+
+
+# ===== HARNESS =====
+async def run_benchmark(args, config, start, base_url, channel):
+    # Point the connectors at the fakes
+    gmail_connector.GMAIL_API_URL = f"{base_url}/gmail/v1/users/me"
+    gmail_connector.GMAIL_BATCH_URL = f"{base_url}/batch/gmail/v1"
+    outlook_connector.GRAPH_URL = f"{base_url}/v1.0"
+
+    # Same pipeline as main.py
+    clock = IngestClock()
+    render_queue = TimedRenderQueue(clock, rate=args.render_rate)
+    render_queue.start()
+    consumers, taps = [render_queue], [clock]
+    if not args.no_storage:
+        index_writer = IndexWriter(os.path.join(args.workdir, "search_index.db"))
+        archive_writer = ArchiveWriter(os.path.join(args.workdir, "archive"))
+        consumers.append(index_writer)
+        taps.append(archive_writer)
+    ingest = Ingest(MessageFilter(DEFAULT_RULES), consumers, taps=taps)
+    pump_task = asyncio.create_task(channel.pump(ingest)) if channel else None
+
+    scheduler = CountingScheduler(
+        base_interval=args.poll_interval, min_interval=args.poll_interval, max_interval=args.poll_interval * 4,
+        budgets={} if args.no_budgets else None
+    )
+    depth_samples = []
+
+    async def sample_depth():
+        while True:
+            depth_samples.append(render_queue.depth())
+            await asyncio.sleep(0.25)
+
+    async with create_http_session() as http:
+        for n in range(args.gmail_accounts):
+            account = f"gmail{n}@bench.local"
+            client = GmailClient(http, Credentials(token=f"fake-{account}"), "unused.json", account,
+                                 budget=scheduler.budget("GMAIL", f"gmail:{account}"))
+            scheduler.add(f"gmail:{account}", "GMAIL", lambda client=client: poll_new_emails(client, ingest.put, args.max_results))
+
+        token_manager = FakeTokenManager()
+        for n in range(args.outlook_accounts):
+            signin = f"outlook{n}@bench.local"
+            mailboxes = {signin: [f"shared{n}-{k}@bench.local" for k in range(args.shared_mailboxes)]}
+            scheduler.add(
+                f"outlook:{signin}", "OUTLOOK",
+                lambda signin=signin, mailboxes=mailboxes, budget=scheduler.budget("OUTLOOK", f"outlook:{signin}"): poll_outlook_account(
+                    http, token_manager, signin, mailboxes, ingest.put, budget=budget
+                )
+            )
+
+        await asyncio.sleep(max(0.0, start - time.time()))
+        began = time.time()
+        background = [asyncio.create_task(scheduler.run()), asyncio.create_task(sample_depth())]
+        await asyncio.sleep(args.duration)
+        background[0].cancel()
+
+        # Let in-flight polls, the Telegram worker and the renderer finish
+        deadline = time.monotonic() + GRACE_PERIOD
+        while time.monotonic() < deadline and (any(job.running for job in scheduler.jobs.values()) or render_queue.depth()):
+            await asyncio.sleep(0.05)
+        if channel:
+            await asyncio.sleep(0.5)  # last events still crossing the process boundary
+        await render_queue.drain()
+        elapsed = time.time() - began
+
+        for task in background + ([pump_task] if pump_task else []):
+            task.cancel()
+        await render_queue.stop()
+        if not args.no_storage:
+            index_writer.close()
+            archive_writer.close()
+
+    return render_queue, clock, scheduler, depth_samples, elapsed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline intra-feed load benchmark against local fakes.")
+    parser.add_argument("--gmail-accounts", type=int, default=2)
+    parser.add_argument("--outlook-accounts", type=int, default=2)
+    parser.add_argument("--shared-mailboxes", type=int, default=0, help="extra mailboxes per Outlook account")
+    parser.add_argument("--telegram-chats", type=int, default=2)
+    parser.add_argument("--rate", type=float, default=5.0, help="messages/sec per mailbox and per chat")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--latency", type=float, default=50.0, help="fake API latency (ms)")
+    parser.add_argument("--jitter", type=float, default=20.0, help="+/- latency jitter (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests / batch items throttled")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="scheduler base / minimum interval (s)")
+    parser.add_argument("--max-results", type=int, default=50, help="Gmail messages per full sync (Outlook delta uses its own page size)")
+    parser.add_argument("--render-rate", type=float, default=None, help="FEED_RENDER_RATE equivalent")
+    parser.add_argument("--no-budgets", action="store_true", help="disable the provider quota buckets")
+    parser.add_argument("--no-storage", action="store_true", help="skip the search index and archive writers")
+    parser.add_argument("--show", action="store_true", help="render to this terminal instead of /dev/null")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    config = FakeConfig(rate=args.rate, latency=args.latency / 1000, jitter=args.jitter / 1000,
+                        error_rate=args.error_rate, retry_after=1)
+
+    with tempfile.TemporaryDirectory(prefix="intra-feed-bench-") as workdir:
+        args.workdir = workdir
+        # Scratch dedup/checkpoint store, set before any process opens one
+        os.environ["FEED_STATE_DB"] = os.path.join(workdir, "feed_state.db")
+        if not args.show:
+            terminal_display.console.file = open(os.devnull, "w")
+
+        start = time.time() + START_DELAY
+        servers = FakeServers(config, start)
+
+        channel = telegram_proc = stats_conn = None
+        if args.telegram_chats:
+            channel = EventChannel()
+            stats_conn, child_conn = multiprocessing.Pipe()
+            chat_ids = [-1000000000000 - n for n in range(args.telegram_chats)]
+            telegram_proc = multiprocessing.Process(
+                target=run_telegram_worker, args=(channel, chat_ids, config, start, args.duration, child_conn), daemon=True
+            )
+            telegram_proc.start()
+
+        render_queue, clock, scheduler, depth_samples, elapsed = asyncio.run(
+            run_benchmark(args, config, start, servers.base_url, channel)
+        )
+
+        extra = servers.stop()
+        if telegram_proc:
+            if stats_conn.poll(GRACE_PERIOD):
+                extra.update(stats_conn.recv())
+            telegram_proc.join(1)
+
+        del args.workdir
+        report = build_report(args, elapsed, render_queue, clock, scheduler, depth_samples, extra)
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
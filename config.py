@@ -3,13 +3,7 @@ import json
 from pathlib import Path
 from display.terminal_display import Console, log_success, log_error, log_warning
 from dotenv import load_dotenv
-
-from telethon import TelegramClient
-from prompt_toolkit import PromptSession
-from prompt_toolkit.completion import FuzzyWordCompleter
-from prompt_toolkit.styles import Style
-from prompt_toolkit.key_binding import KeyBindings
-from prompt_toolkit.formatted_text import HTML
+# telethon / prompt_toolkit are only needed by the chat picker, see edit_config()
 
 # Constants
 ENV_FILE_PATH = Path(".env")
@@ -72,6 +66,13 @@ def check_config() -> None:
 
 
 def edit_config():
+    from telethon import TelegramClient
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.completion import FuzzyWordCompleter
+    from prompt_toolkit.styles import Style
+    from prompt_toolkit.key_binding import KeyBindings
+    from prompt_toolkit.formatted_text import HTML
+
     api_id = os.getenv("TG_API_ID")
     api_hash = os.getenv("TG_API_HASH")
     client = TelegramClient("session_name", api_id, api_hash)
@@ -0,0 +1,162 @@
+import os
+import asyncio
+import tempfile
+from datetime import datetime, timezone
+from display.terminal_display import log_error, log_warning
+# Connector modules (and their Google / msal imports) are loaded by the methods that need them.
+
+# ===== CONFIG =====
+AUTH_TIMEOUT = 30       # seconds one silent token load / refresh may take
+AUTH_RETRIES = 3        # silent attempts per account before it is skipped for this run
+RETRY_DELAY = 5         # seconds before the first retry (doubles after each failure)
+REFRESH_MARGIN = 300    # refresh Gmail access tokens this many seconds before they expire
+REFRESH_RETRY = 60      # seconds between background refresh attempts after a failure
+
+
+# ===== TOKEN FILES =====
+def write_token_file(path, text):
+    """
+    Replace `path` atomically: write a temp file in the same folder, fsync it, then os.replace.
+    A crash mid-write leaves the previous token intact instead of a truncated JSON file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".token-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def seconds_until_refresh(expiry, margin=REFRESH_MARGIN):
+    """Seconds until a google-auth `expiry` (naive UTC datetime) is within `margin` of passing."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return max(0.0, (expiry - now).total_seconds() - margin)
+
+
+# ===== CREDENTIAL MANAGER =====
+class CredentialManager:
+    """
+    Loads every Gmail / Outlook credential concurrently, each in a worker thread with its own
+    timeout and retries, so one slow or broken account never holds up the rest.
+    Interactive logins (browser / device code) have no timeout but run one at a time.
+    Gmail tokens are then refreshed in the background before they expire
+    (OutlookTokenManager already keeps its own refresh timers).
+    """
+
+    def __init__(self, timeout=AUTH_TIMEOUT, retries=AUTH_RETRIES):
+        self.timeout = timeout
+        self.retries = retries
+        self.failed = []        # names of accounts that could not be loaded
+        self._login_lock = asyncio.Lock()
+        self._refreshers = {}   # account -> background refresh task
+
+    async def _load(self, name, load_silent, login):
+        """
+        Run `load_silent` (returns None when a login is needed) with timeout + retries,
+        falling back to `login` once if there is no usable token. Never raises.
+        """
+        delay = RETRY_DELAY
+        for attempt in range(1, self.retries + 1):
+            try:
+                result = await asyncio.wait_for(asyncio.to_thread(load_silent), self.timeout)
+            except asyncio.TimeoutError:
+                log_warning(f"⚠ {name}: token load timed out after {self.timeout}s (attempt {attempt}/{self.retries})")
+            except Exception as e:
+                log_warning(f"⚠ {name}: token load failed: {e} (attempt {attempt}/{self.retries})")
+            else:
+                if result is not None:
+                    return result
+                async with self._login_lock:
+                    log_warning(f"🔐 {name}: login required")
+                    try:
+                        result = await asyncio.to_thread(login)
+                    except Exception as e:
+                        log_error(f"❌ {name}: login failed: {e}")
+                if result is not None:
+                    return result
+                break
+            if attempt < self.retries:
+                await asyncio.sleep(delay)
+                delay *= 2
+
+        log_error(f"❌ {name}: no valid credentials, skipped for this run")
+        self.failed.append(name)
+        return None
+
+    # ------------------ Gmail ------------------
+
+    async def gmail(self, account, credentials_file, token_file, keep_fresh=True):
+        """Credentials for one Gmail account (None if it could not be loaded)."""
+        from connectors.gmail_connector import load_credentials
+
+        creds = await self._load(
+            f"Gmail {account}",
+            lambda: load_credentials(credentials_file, token_file, interactive=False),
+            lambda: load_credentials(credentials_file, token_file),
+        )
+        if creds and keep_fresh:
+            self._refreshers[account] = asyncio.create_task(self._keep_gmail_fresh(account, creds, token_file))
+        return creds
+
+    async def load_gmail_accounts(self, accounts, keep_fresh=False):
+        """{account: {"Credentials": ..., "Token": ...}} -> {account: creds or None}, loaded concurrently."""
+        results = await asyncio.gather(*(
+            self.gmail(account, details["Credentials"], details["Token"], keep_fresh=keep_fresh)
+            for account, details in accounts.items()
+        ))
+        return dict(zip(accounts, results))
+
+    async def _keep_gmail_fresh(self, account, creds, token_file):
+        """Refresh `creds` in place shortly before every expiry and rewrite its token file."""
+        from google.auth.transport.requests import Request
+        from connectors.gmail_connector import AUTH_FOLDER
+        token_path = os.path.join(AUTH_FOLDER, token_file)
+
+        def refresh():
+            creds.refresh(Request())
+            write_token_file(token_path, creds.to_json())
+
+        while creds.expiry is not None:
+            await asyncio.sleep(seconds_until_refresh(creds.expiry))
+            try:
+                await asyncio.wait_for(asyncio.to_thread(refresh), self.timeout)
+            except Exception as e:
+                # GmailClient still refreshes on demand if the token does expire
+                log_warning(f"⚠ Gmail {account}: token refresh failed ({str(e) or 'timed out'}), retrying in {REFRESH_RETRY}s")
+                await asyncio.sleep(REFRESH_RETRY)
+
+    # ------------------ Outlook ------------------
+
+    async def outlook(self, client_id, tenant_id=None, usernames=()):
+        """
+        Token manager plus the usernames whose token could be acquired
+        (all refreshed concurrently; None = the first cached account / device login).
+        """
+        from connectors.outlook_connector import get_token_manager
+
+        try:
+            token_manager = await asyncio.wait_for(asyncio.to_thread(get_token_manager, client_id, tenant_id), self.timeout)
+        except Exception as e:
+            log_error(f"❌ Outlook: could not load the token cache: {str(e) or 'timed out'}")
+            self.failed.append("Outlook")
+            return None, []
+
+        usernames = list(usernames) or [None]
+        results = await asyncio.gather(*(
+            self._load(
+                f"Outlook {username or 'account'}",
+                lambda username=username: token_manager.get_token(username, interactive=False),
+                lambda username=username: token_manager.get_token(username),
+            )
+            for username in usernames
+        ))
+        return token_manager, [username for username, result in zip(usernames, results) if result]
+
+    def close(self):
+        for task in self._refreshers.values():
+            task.cancel()
@@ -1,19 +1,42 @@
 import os
+import re
 import json
-from time import sleep
-from datetime import datetime
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import html
+import uuid
+import base64
+import asyncio
+from urllib.parse import urlencode
+# Google client libraries are imported on first use (auth / refresh),
+# so startup does not pay for them until a Gmail account is actually loaded.
+from storage.dedup_store import get_store
+from pipeline.message import FeedMessage
+from pipeline.metrics import API_REQUESTS, API_ERRORS
+from display.terminal_display import log_warning
+from connectors.credentials import write_token_file
 
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
 AUTH_FOLDER = "auth"  # folder where credentials and token files are stored
+OTHER_CATEGORIES = {"CATEGORY_SOCIAL", "CATEGORY_PROMOTIONS", "CATEGORY_UPDATES", "CATEGORY_FORUMS"}
 
+GMAIL_API_URL = "https://gmail.googleapis.com/gmail/v1/users/me"
+GMAIL_BATCH_URL = "https://gmail.googleapis.com/batch/gmail/v1"
+METADATA_HEADERS = ["Subject", "From"]  # only the headers we actually display
+BATCH_LIMIT = 100  # Gmail rejects batches with more than 100 calls
+DEFAULT_RETRY_AFTER = 30  # seconds to back off on throttling without a Retry-After header
+
+# Gmail quota units per call (batched calls are still charged individually)
+QUOTA_UNITS = {"/messages": 5, "/history": 2, "/profile": 1, "messages.get": 5}
+
+
+# ===== AUTH =====
+def load_credentials(credentials_file, token_file, interactive=True):
+    """
+    Load (and refresh / log in if needed) OAuth2 credentials; saves token for future use.
+    With interactive=False, returns None instead of opening the browser login.
+    """
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
 
-def get_gmail_service(credentials_file, token_file):
-    """Authenticate with Gmail API using OAuth2; saves token for future use."""
     creds = None
     token_path = os.path.join(AUTH_FOLDER, token_file)
     credentials_path = os.path.join(AUTH_FOLDER, credentials_file)
@@ -26,97 +49,334 @@ def get_gmail_service(credentials_file, token_file):
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
+        elif not interactive:
+            return None
         else:
+            from google_auth_oauthlib.flow import InstalledAppFlow
             flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
             creds = flow.run_local_server(port=0)
 
         # Save token for next time
-        with open(token_path, "w") as token_file_obj:
-            token_file_obj.write(creds.to_json())
+        write_token_file(token_path, creds.to_json())
 
-    return build("gmail", "v1", credentials=creds)
+    return creds
 
 def set_up_gmail_services(): # Use function if lose token file # For credentials must get from Google Cloud
+    """Log in / refresh every account in GMAIL_ACCOUNTS (concurrently; browser logins one at a time)."""
     raw = os.getenv("GMAIL_ACCOUNTS")
     if raw is None:
         raise RuntimeError("GMAIL_ACCOUNTS not found in environment")
     accounts = json.loads(raw)
-    for key,value in accounts.items():
-        cred = value["Credentials"]
-        token = value["Token"]
-        service = get_gmail_service(cred,token)
-        # Make use you have set up the OAuth client and added test users
-        sleep(20)
-
-def get_unread_emails(service, max_results=10):
-    """Fetch unread emails from Gmail's Primary tab only, including timestamp, sorted newest first."""
-    try:
-        results = service.users().messages().list(
-            userId="me",
-            labelIds=["INBOX"],
-            q="is:unread category:primary",
-            maxResults=max_results
-        ).execute()
-
-        messages = results.get("messages", [])
-        if not messages:
-            return []
-
-        emails = []
-        for msg in messages:
-            msg_id = msg["id"]
-            msg_data = service.users().messages().get(
-                userId="me", id=msg_id, format="full"
-            ).execute()
-
-            payload = msg_data.get("payload", {})
-            headers = payload.get("headers", [])
-            subject = sender = None
-            for header in headers:
-                if header.get("name") == "Subject":
-                    subject = header.get("value")
-                elif header.get("name") == "From":
-                    sender = header.get("value")
-
-            snippet = msg_data.get("snippet", "")
-            
-            # Get timestamp
-            internal_ts = int(msg_data.get("internalDate", 0)) / 1000  # convert ms to s
-            timestamp = datetime.fromtimestamp(internal_ts).strftime("%Y-%m-%d %H:%M:%S")
-
-            emails.append({
-                "id": msg_id,
-                "sender": sender,
-                "subject": subject,
-                "snippet": snippet,
-                "timestamp": timestamp,
-                "internal_ts": internal_ts  # keep numeric for sorting
-            })
-
-        # Sort emails by timestamp descending (newest first)
-        emails.sort(key=lambda e: e["internal_ts"], reverse=True)
-
-        # Optionally remove internal_ts if not needed
-        for e in emails:
-            e.pop("internal_ts")
-
-        return emails
-
-    except HttpError as error:
-        print(f"An error occurred: {error}")
+    # Make use you have set up the OAuth client and added test users
+    from connectors.credentials import CredentialManager
+    return asyncio.run(CredentialManager().load_gmail_accounts(accounts))
+
+
+# ===== ASYNC REST CLIENT =====
+class GmailApiError(Exception):
+    def __init__(self, status, message="", retry_after=None):
+        super().__init__(f"Gmail API error {status}: {message[:200]}")
+        self.status = status
+        self.retry_after = retry_after  # set for throttling errors; the scheduler backs off at least this long
+
+def is_rate_limited(status, text):
+    """429, or a 403 with reason rateLimitExceeded / userRateLimitExceeded."""
+    return status == 429 or (status == 403 and "ratelimitexceeded" in text.lower())
+
+def raise_for_gmail_status(status, text, headers):
+    if status < 400:
+        return
+    retry_after = None
+    if is_rate_limited(status, text) or status == 503:
+        retry_after = float(headers.get("Retry-After") or DEFAULT_RETRY_AFTER)
+    raise GmailApiError(status, text, retry_after)
+
+class HistoryExpiredError(Exception):
+    """Raised when Gmail no longer has history for the stored historyId."""
+
+
+class GmailClient:
+    """
+    Asyncio Gmail REST client for one account. All accounts share one aiohttp
+    session (connection pool); the OAuth token is refreshed off-loop only when expired.
+    If a `budget` (TokenBucket) is given, every call first spends its Gmail quota units.
+    """
+
+    def __init__(self, http, creds, token_file, account, budget=None):
+        self.http = http
+        self.creds = creds
+        self.token_path = os.path.join(AUTH_FOLDER, token_file)
+        self.account = account
+        self.budget = budget
+        self.throttled = 0  # batch items rejected with 429 since the last poll
+        self._refresh_lock = asyncio.Lock()
+
+    async def _spend(self, units):
+        if self.budget:
+            await self.budget.acquire(units)
+
+    async def _auth_headers(self):
+        if not self.creds.valid:
+            async with self._refresh_lock:
+                if not self.creds.valid:
+                    from google.auth.transport.requests import Request
+                    await asyncio.to_thread(self.creds.refresh, Request())
+                    write_token_file(self.token_path, self.creds.to_json())
+        return {"Authorization": f"Bearer {self.creds.token}"}
+
+    async def get_json(self, path, params=None):
+        await self._spend(QUOTA_UNITS.get(path, 5))
+        API_REQUESTS.inc("GMAIL", self.account)
+        async with self.http.get(f"{GMAIL_API_URL}{path}", params=params, headers=await self._auth_headers()) as res:
+            if res.status >= 400:
+                API_ERRORS.inc("GMAIL", self.account, res.status)
+                raise_for_gmail_status(res.status, await res.text(), res.headers)
+            return await res.json()
+
+    async def get_message_detail(self, msg_id):
+        """Full message (body + attachment names), only fetched when a message is opened."""
+        return parse_message_detail(await self.get_json(f"/messages/{msg_id}", {"format": "full"}))
+
+    async def batch_get_metadata(self, msg_ids):
+        """
+        Fetch metadata for many message IDs using Gmail multipart batch requests
+        (one HTTP round trip per 100 IDs instead of one per message).
+        Returns (emails, failed_ids); failed_ids only holds retryable failures (429 / 5xx / no
+        answer). Permanent ones, like a 404 for a message deleted since history.list, are skipped.
+        """
+        emails, failed = [], []
+        query = urlencode([("format", "metadata")] + [("metadataHeaders", h) for h in METADATA_HEADERS])
+
+        for start in range(0, len(msg_ids), BATCH_LIMIT):
+            chunk = msg_ids[start:start + BATCH_LIMIT]
+            boundary = f"batch_{uuid.uuid4().hex}"
+            body = "".join(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <{msg_id}>\r\n\r\n"
+                f"GET /gmail/v1/users/me/messages/{msg_id}?{query}\r\n\r\n"
+                for msg_id in chunk
+            ) + f"--{boundary}--"
+            await self._spend(QUOTA_UNITS["messages.get"] * len(chunk))
+            headers = await self._auth_headers()
+            headers["Content-Type"] = f"multipart/mixed; boundary={boundary}"
+
+            API_REQUESTS.inc("GMAIL", self.account)
+            async with self.http.post(GMAIL_BATCH_URL, data=body.encode(), headers=headers) as res:
+                if res.status >= 400:
+                    API_ERRORS.inc("GMAIL", self.account, res.status)
+                    raise_for_gmail_status(res.status, await res.text(), res.headers)
+                parts = parse_batch_response(await res.text(), res.headers.get("Content-Type", ""))
+
+            answered = set()
+            for content_id, status, payload in parts:
+                answered.add(content_id)
+                if status >= 400:
+                    API_ERRORS.inc("GMAIL", self.account, status)
+                    throttled = is_rate_limited(status, json.dumps(payload))
+                    if throttled:
+                        self.throttled += 1
+                    else:
+                        log_warning(f"⚠ Gmail ({self.account}): error {status} fetching message {content_id}")
+                    if throttled or status >= 500:
+                        failed.append(content_id)
+                    continue
+                emails.append(parse_message_metadata(payload, self.account))
+            failed.extend(msg_id for msg_id in chunk if msg_id not in answered)
+
+        return emails, failed
+
+
+def parse_batch_response(text, content_type):
+    """Split a multipart/mixed batch response into (content_id, status, json_body) tuples."""
+    match = re.search(r'boundary="?([^";]+)"?', content_type)
+    if not match:
         return []
-    
-def monitor_new_emails(service, callback, interval=60, max_results=10): # callback is print
-    seen_email_ids = set()
-    sleep(3)
+
+    parts = []
+    for raw_part in text.split(f"--{match.group(1)}"):
+        raw_part = raw_part.strip()
+        if not raw_part or raw_part == "--":
+            continue
+        # outer part headers / embedded HTTP response (status line + headers) / JSON body
+        sections = re.split(r"\r?\n\r?\n", raw_part, maxsplit=2)
+        if len(sections) < 3:
+            continue
+        outer, inner, payload = sections
+        content_id = re.search(r"Content-ID:\s*<(?:response-)?([^>]+)>", outer, re.IGNORECASE)
+        status = re.match(r"HTTP/\S+\s+(\d+)", inner)
+        try:
+            body = json.loads(payload) if payload.strip() else {}
+        except json.JSONDecodeError:
+            body = {}
+        parts.append((content_id.group(1) if content_id else "", int(status.group(1)) if status else 500, body))
+    return parts
+
+def parse_message_metadata(msg_data, account=None):
+    """Turn a messages.get(format="metadata") response into a FeedMessage."""
+    headers = msg_data.get("payload", {}).get("headers", [])
+    subject = sender = None
+    for header in headers:
+        if header.get("name") == "Subject":
+            subject = header.get("value")
+        elif header.get("name") == "From":
+            sender = header.get("value")
+
+    return FeedMessage.from_raw_sender(
+        "GMAIL", msg_data["id"], sender,
+        subject=subject,
+        text=msg_data.get("snippet", ""),
+        account=account,
+        timestamp=int(msg_data.get("internalDate", 0)) / 1000  # convert ms to s
+    )
+
+def html_to_text(markup):
+    """Rough plain text for HTML-only mails: drop scripts/styles and tags, keep line breaks."""
+    markup = re.sub(r"(?is)<(script|style|head)\b.*?</\1>", "", markup)
+    markup = re.sub(r"(?i)<br\s*/?>|</(p|div|tr|li|h[1-6])>", "\n", markup)
+    text = html.unescape(re.sub(r"<[^>]+>", "", markup))
+    return re.sub(r"\n\s*\n+", "\n\n", text).strip()
+
+def parse_message_detail(msg_data):
+    """Headers, plain-text body and attachment names from a messages.get(format="full") response."""
+    payload = msg_data.get("payload", {})
+    headers = {header.get("name", "").lower(): header.get("value") for header in payload.get("headers", [])}
+    plain, markup, attachments = [], [], []
+    parts = [payload]
+    while parts:
+        part = parts.pop()
+        parts.extend(reversed(part.get("parts", [])))
+        if part.get("filename"):
+            attachments.append(part["filename"])
+            continue
+        data = part.get("body", {}).get("data")
+        if not data:
+            continue
+        text = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)).decode("utf-8", errors="replace")
+        if part.get("mimeType") == "text/plain":
+            plain.append(text)
+        elif part.get("mimeType") == "text/html":
+            markup.append(text)
+
+    return {
+        "subject": headers.get("subject"),
+        "from": headers.get("from"),
+        "to": headers.get("to"),
+        "cc": headers.get("cc"),
+        "date": headers.get("date"),
+        "body": "\n".join(plain).strip() or html_to_text("\n".join(markup)) or msg_data.get("snippet", ""),
+        "attachments": attachments,
+    }
+
+def sort_newest_first(emails):
+    """Sort emails by timestamp descending."""
+    emails.sort(key=lambda e: e.timestamp, reverse=True)
+    return emails
+
+
+# ===== FETCH UNREAD EMAILS =====
+async def get_unread_emails(client, max_results=10, seen_ids=None):
+    """
+    Fetch unread emails from Gmail's Primary tab only, including timestamp, sorted newest first.
+    IDs already in `seen_ids` are skipped before any message is fetched.
+    Returns (emails, failed IDs worth retrying).
+    """
+    seen_ids = seen_ids or set()
+    results = await client.get_json("/messages", params={
+        "labelIds": "INBOX",
+        "q": "is:unread category:primary",
+        "maxResults": max_results
+    })
+
+    messages = results.get("messages", [])
+    new_ids = [msg["id"] for msg in messages if msg["id"] not in seen_ids]
+    if not new_ids:
+        return [], []
+
+    emails, failed = await client.batch_get_metadata(new_ids)
+    return sort_newest_first(emails), failed
+
+# ===== INCREMENTAL SYNC (users.history) =====
+def load_history_checkpoint(account):
+    return get_store().get_checkpoint(f"gmail:history:{account}")
+
+def save_history_checkpoint(account, history_id):
+    get_store().set_checkpoint(f"gmail:history:{account}", str(history_id))
+
+async def get_current_history_id(client):
+    return (await client.get_json("/profile"))["historyId"]
+
+async def get_added_message_ids(client, start_history_id):
+    """
+    Return (message_ids, latest_history_id) for unread Primary inbox messages
+    added since `start_history_id`.
+    """
+    msg_ids = []
+    latest_history_id = start_history_id
+    params = {"startHistoryId": start_history_id, "historyTypes": "messageAdded", "labelId": "INBOX"}
     while True:
-        unread_emails = get_unread_emails(service, max_results)
-        new_emails = [email for email in unread_emails if email['id'] not in seen_email_ids]
+        try:
+            response = await client.get_json("/history", params=params)
+        except GmailApiError as error:
+            if error.status == 404:  # historyId too old / invalid
+                raise HistoryExpiredError(start_history_id) from error
+            raise
+
+        for record in response.get("history", []):
+            for added in record.get("messagesAdded", []):
+                msg = added["message"]
+                labels = set(msg.get("labelIds", []))
+                if "UNREAD" in labels and not labels & OTHER_CATEGORIES and msg["id"] not in msg_ids:
+                    msg_ids.append(msg["id"])
+
+        latest_history_id = response.get("historyId", latest_history_id)
+        if not response.get("nextPageToken"):
+            return msg_ids, latest_history_id
+        params["pageToken"] = response["nextPageToken"]
+
+async def sync_new_emails(client, max_results=10, seen_ids=None):
+    """
+    Incremental fetch: only messages added since the stored historyId checkpoint.
+    Falls back to a full unread listing on first run or when the history has expired.
+    """
+    seen_ids = seen_ids or set()
+    account = client.account
+    checkpoint = load_history_checkpoint(account)
+    if checkpoint:
+        try:
+            msg_ids, latest_history_id = await get_added_message_ids(client, checkpoint)
+            new_ids = [msg_id for msg_id in msg_ids if msg_id not in seen_ids]
+            emails, failed = await client.batch_get_metadata(new_ids) if new_ids else ([], [])
+            # Only move the checkpoint once no new message is left to retry
+            if not failed and str(latest_history_id) != checkpoint:
+                save_history_checkpoint(account, latest_history_id)
+            return sort_newest_first(emails)
+        except HistoryExpiredError:
+            log_warning(f"⚠ Gmail history expired for {account}, running a full sync.")
 
-        for email_data in new_emails:
-            seen_email_ids.add(email_data['id'])
-            callback(email_data)  # <--- This is where the callback is called
+    # Take the baseline before listing so nothing slips in between
+    history_id = await get_current_history_id(client)
+    emails, failed = await get_unread_emails(client, max_results, seen_ids=seen_ids)
+    # Without a checkpoint the next poll repeats the full sync, which picks up the failed IDs
+    if not failed:
+        save_history_checkpoint(account, history_id)
+    return emails
 
-        sleep(interval)
+async def poll_new_emails(client, callback, max_results=10):
+    """
+    One incremental poll (users.history); awaits `callback` for every new email and
+    returns how many there were. API errors propagate to the scheduler for backoff.
+    """
+    # Seen IDs persist across restarts (bounded, shared with the other connectors)
+    seen_email_ids = get_store().view(f"gmail:{client.account}")
+    new_emails = await sync_new_emails(client, max_results, seen_ids=seen_email_ids)
 
+    for email_data in new_emails:
+        seen_email_ids.add(email_data.message_id)
+        await callback(email_data)  # <--- This is where the callback is called
 
+    if client.throttled:
+        # Unfetched IDs are retried next poll: the checkpoint is only saved once nothing failed
+        throttled, client.throttled = client.throttled, 0
+        raise GmailApiError(429, f"{throttled} batched messages throttled", DEFAULT_RETRY_AFTER)
+    return len(new_emails)
@@ -0,0 +1,20 @@
+import aiohttp
+
+# ===== SHARED HTTP POOL =====
+MAX_CONNECTIONS = 100          # across all hosts
+MAX_CONNECTIONS_PER_HOST = 20  # e.g. gmail.googleapis.com / graph.microsoft.com
+REQUEST_TIMEOUT = 30           # seconds, whole request
+
+
+def create_http_session():
+    """
+    One aiohttp session (keep-alive connection pool) for every Gmail / Outlook poller.
+    Create it inside the running event loop and close it on shutdown.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONNECTIONS,
+        limit_per_host=MAX_CONNECTIONS_PER_HOST,
+        ttl_dns_cache=300,
+        keepalive_timeout=60,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT))
@@ -1,12 +1,27 @@
 import os
-import requests
+import time
 import json
-from msal import PublicClientApplication, SerializableTokenCache
-from time import sleep
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote, urlencode
 from display.terminal_display import console  
+from storage.dedup_store import get_store
+from pipeline.message import FeedMessage
+from pipeline.metrics import API_REQUESTS, API_ERRORS
+from connectors.credentials import write_token_file
 
 # ===== CONFIG =====
 SCOPES = ["Mail.Read"]
+AUTHORITY = "https://login.microsoftonline.com/common"
+REFRESH_MARGIN = 300  # refresh the access token this many seconds before it expires
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+SELECT_FIELDS = "id,subject,from,receivedDateTime,isRead"  # only what we display / filter on
+DETAIL_FIELDS = "subject,from,toRecipients,ccRecipients,receivedDateTime,body"  # when a message is opened
+INITIAL_SYNC_DAYS = 7  # how far back the first delta round looks
+DELTA_PAGE_SIZE = 200  # messages per delta page: a cold start walks days of Inbox, read mail included
+BATCH_LIMIT = 20  # Graph JSON $batch accepts at most 20 requests
+DEFAULT_RETRY_AFTER = 30  # seconds to back off on throttling without a Retry-After header
 
 # ===== TOKEN PATH (always relative to project root) =====
 AUTH_FOLDER = os.path.join(os.getcwd(), "auth")
@@ -15,128 +30,340 @@ TOKEN_CACHE_FILE = os.path.join(AUTH_FOLDER, "outlooktoken.json")
 
 # ===== TOKEN CACHE =====
 def load_cache():
+    from msal import SerializableTokenCache  # msal is only imported once Outlook is actually used
     cache = SerializableTokenCache()
     if os.path.exists(TOKEN_CACHE_FILE):
         with open(TOKEN_CACHE_FILE, "r") as f:
             cache.deserialize(f.read())
     return cache
 
-def check_token_and_get_active_email():
+def get_cached_outlook_accounts():
+    """Usernames of every account stored in the shared MSAL token cache file."""
     if not os.path.exists(TOKEN_CACHE_FILE):
-        return None
+        return []
 
     with open(TOKEN_CACHE_FILE, "r") as f:
-        data = f.read()
+        try:
+            cache_json = json.load(f)
+        except json.JSONDecodeError:
+            return []
 
-    try:
-        cache_json = json.loads(data)
-    except json.JSONDecodeError:
-        return None
-
-    # MSAL cache stores accounts under "Account" key
-    accounts = cache_json.get("Account", {})
-    if not accounts:
-        return None
-
-    # Get the first username in the accounts
-    first_account_obj = next(iter(accounts.values()))
-    username = first_account_obj.get("username")
-    return username
+    return [acct.get("username") for acct in cache_json.get("Account", {}).values() if acct.get("username")]
 
 def save_cache(cache):
     os.makedirs(AUTH_FOLDER, exist_ok=True)
-    with open(TOKEN_CACHE_FILE, "w") as f:
-        f.write(cache.serialize())
+    write_token_file(TOKEN_CACHE_FILE, cache.serialize())
 
 
-# ===== MAIN LOGIN FUNCTION =====
-def acquire_token(client_id, tenant_id=None):
+# ===== TOKEN MANAGER =====
+class OutlookTokenManager:
     """
-    Acquire Outlook token using MSAL with given client_id.
-    Uses /common authority so any Microsoft account can login.
-    tenant_id is optional for future flexibility.
+    Keeps one MSAL app and its token cache in memory for the life of the process.
+    Access tokens (one per signed-in account) are served from memory and refreshed on a
+    background timer shortly before `expires_in`; the cache file is only rewritten when MSAL changed it.
+    Each account refreshes under its own lock, so one slow account does not hold up the others;
+    device logins still run one at a time.
     """
-    authority = "https://login.microsoftonline.com/common"
-    cache = load_cache()
-    app = PublicClientApplication(client_id, authority=authority, token_cache=cache)
-
-    # Try silent login if token exists
-    accounts = app.get_accounts()
-    if accounts:
-        result = app.acquire_token_silent(SCOPES, account=accounts[0])
-        if result and "access_token" in result:
-            # console.print("🔄 Using cached token", style="green")
-            return result
-
-    # Device code flow
-    console.print("🔐 No cached token found. Starting device code login...", style="yellow")
-    flow = app.initiate_device_flow(scopes=SCOPES)
-    if "user_code" not in flow:
-        raise ValueError("Failed to create device flow. Check your app registration.")
-
-    console.print(flow["message"], style="cyan")
-    result = app.acquire_token_by_device_flow(flow)
-
-    # Save cache after login
-    save_cache(cache)
-
-    if "access_token" in result:
-        return result
-    else:
-        console.print("❌ Failed to acquire token: " + str(result.get("error_description")), style="bold red")
+
+    def __init__(self, client_id, tenant_id=None):
+        self.client_id = client_id
+        self.tenant_id = tenant_id  # optional, kept for future flexibility
+        from msal import PublicClientApplication
+        self.cache = load_cache()
+        self.app = PublicClientApplication(client_id, authority=AUTHORITY, token_cache=self.cache)
+        self._lock = threading.Lock()        # guards _locks / _timers and cache file writes
+        self._locks = {}     # username -> refresh lock
+        self._login_lock = threading.Lock()  # one device-code prompt at a time
+        self._results = {}   # username -> (token result, expires_at)
+        self._timers = {}    # username -> refresh timer
+
+    def list_accounts(self):
+        """Usernames of every account in the shared token cache."""
+        return [acct["username"] for acct in self.app.get_accounts()]
+
+    def _lock_for(self, username):
+        with self._lock:
+            return self._locks.setdefault(username, threading.Lock())
+
+    def get_token(self, username=None, interactive=True):
+        """Return the MSAL token result for `username` (first cached account if None), refreshing only if (nearly) expired."""
+        with self._lock_for(username):
+            cached = self._results.get(username)
+            if cached and time.time() < cached[1] - REFRESH_MARGIN:
+                return cached[0]
+            return self._refresh_locked(username, interactive=interactive)
+
+    def peek(self, username=None):
+        """Cached token result if it is still fresh, else None (never blocks on the network)."""
+        cached = self._results.get(username)
+        if cached and time.time() < cached[1] - REFRESH_MARGIN:
+            return cached[0]
         return None
 
+    async def get_token_async(self, username=None):
+        """Event-loop friendly get_token: memory hit inline, refresh / device login in a worker thread."""
+        return self.peek(username) or await asyncio.to_thread(self.get_token, username)
+
+    def _refresh_locked(self, username, interactive=True, force_refresh=False):
+        result = None
+        accounts = self.app.get_accounts(username=username)
+        if accounts:
+            result = self.app.acquire_token_silent(SCOPES, account=accounts[0], force_refresh=force_refresh)
+
+        if not (result and "access_token" in result) and interactive:
+            result = self._device_flow_login(username)
+
+        self._save_if_changed()
+
+        if not (result and "access_token" in result):
+            if result:
+                console.print("❌ Failed to acquire token: " + str(result.get("error_description")), style="bold red")
+            self._results.pop(username, None)
+            return None
+
+        expires_at = time.time() + int(result.get("expires_in", 3600))
+        self._results[username] = (result, expires_at)
+        self._schedule_refresh(username, expires_at)
+        return result
+
+    def _device_flow_login(self, username=None):
+        with self._login_lock:
+            return self._device_flow_login_locked(username)
+
+    def _device_flow_login_locked(self, username=None):
+        console.print("🔐 No cached token found. Starting device code login...", style="yellow")
+        if username:
+            console.print(f"Sign in as {username}", style="yellow")
+        flow = self.app.initiate_device_flow(scopes=SCOPES)
+        if "user_code" not in flow:
+            raise ValueError("Failed to create device flow. Check your app registration.")
+
+        console.print(flow["message"], style="cyan")
+        return self.app.acquire_token_by_device_flow(flow)
+
+    def _save_if_changed(self):
+        with self._lock:
+            if self.cache.has_state_changed:
+                save_cache(self.cache)
+
+    def _schedule_refresh(self, username, expires_at):
+        delay = max(0, expires_at - REFRESH_MARGIN - time.time())
+        timer = threading.Timer(delay, self._background_refresh, args=(username,))
+        timer.daemon = True
+        with self._lock:
+            if username in self._timers:
+                self._timers[username].cancel()
+            self._timers[username] = timer
+        timer.start()
+
+    def _background_refresh(self, username):
+        with self._lock_for(username):
+            try:
+                self._refresh_locked(username, interactive=False, force_refresh=True)
+            except Exception as e:
+                # Next get_token() call will retry (and fall back to device login if needed)
+                console.print(f"❌ Outlook token refresh failed: {e}", style="red")
+
+    def close(self):
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+
+
+_token_managers = {}
+_token_managers_lock = threading.Lock()
 
-# ===== FETCH UNREAD EMAILS =====
-def fetch_unread_emails_structured(access_token, max_results=10):
+def get_token_manager(client_id, tenant_id=None):
+    """One long-lived token manager per client_id."""
+    with _token_managers_lock:
+        if client_id not in _token_managers:
+            _token_managers[client_id] = OutlookTokenManager(client_id, tenant_id)
+        return _token_managers[client_id]
+
+
+# ===== MESSAGES =====
+def format_message(mail, mailbox=None):
+    """Turn a Graph message resource into a FeedMessage."""
+    address = mail.get("from", {}).get("emailAddress", {})
+    received = mail.get("receivedDateTime")
+    return FeedMessage(
+        "OUTLOOK", mail["id"],
+        address.get("name") or address.get("address") or "(unknown)",
+        address.get("address"),
+        subject=mail.get("subject") or "(no subject)",
+        account=mailbox,
+        timestamp=datetime.fromisoformat(received.replace("Z", "+00:00")).timestamp() if received else 0.0
+    )
+
+# ===== DELTA SYNC VIA $batch =====
+class GraphApiError(Exception):
+    def __init__(self, status, message="", retry_after=None):
+        super().__init__(f"Graph API error {status}: {message}")
+        self.status = status
+        self.retry_after = retry_after  # set for throttling errors; the scheduler backs off at least this long
+
+def mailbox_path(mailbox, signin):
+    """Graph path for a mailbox: the signed-in user's own is /me, shared/delegated ones are /users/{address}."""
+    return "/me" if mailbox == signin else f"/users/{quote(mailbox, safe='@')}"
+
+def initial_delta_url(path):
+    since = (datetime.now(timezone.utc) - timedelta(days=INITIAL_SYNC_DAYS)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    query = urlencode({"$select": SELECT_FIELDS, "$filter": f"receivedDateTime ge {since}"}, quote_via=quote, safe="$,")
+    return f"{path}/mailFolders/Inbox/messages/delta?{query}"
+
+def relative_url(url):
+    """$batch only accepts URLs relative to the Graph version root."""
+    return url[len(GRAPH_URL):] if url.startswith(GRAPH_URL) else url
+
+async def batch_delta_sync(http, access_token, delta_links, page_size=DELTA_PAGE_SIZE, budget=None, account=None):
     """
-    Fetch unread emails from Outlook and return a list of dicts.
+    Run one messages/delta round for several mailboxes through Graph JSON $batch
+    (up to 20 mailboxes per HTTP round trip, more rounds only while pages remain).
+
+    `delta_links` maps mailbox -> stored delta link (or initial delta URL).
+    Returns {mailbox: {"emails": [...], "delta_link": str | None, "expired": bool, "retry_after": float | None}};
+    delta_link is None when the round failed and the stored link should be kept.
+    Transport errors and a throttled/failed $batch call raise (GraphApiError / aiohttp errors).
+    `account` (the signed-in user) only labels the API metrics.
     """
-    headers = {"Authorization": f"Bearer {access_token}"}
-    url = (
-        "https://graph.microsoft.com/v1.0/me/mailFolders/Inbox/messages"
-        f"?$filter=isRead eq false&$top={max_results}"
-    )
+    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+    results = {mb: {"emails": [], "delta_link": None, "expired": False, "retry_after": None} for mb in delta_links}
+    pending = {mb: relative_url(url) for mb, url in delta_links.items()}
 
-    try:
-        res = requests.get(url, headers=headers, timeout=10)
-        res.raise_for_status()
-    except requests.RequestException as e:
-        console.print(f"❌ Outlook API Error: {e}", style="red")
-        return []
+    while pending:
+        items = list(pending.items())
+        pending = {}
+        for start in range(0, len(items), BATCH_LIMIT):
+            chunk = items[start:start + BATCH_LIMIT]
+            body = {"requests": [
+                {"id": str(i), "method": "GET", "url": url,
+                 "headers": {"Prefer": f"odata.maxpagesize={page_size}"}}
+                for i, (_, url) in enumerate(chunk)
+            ]}
+            if budget:
+                await budget.acquire(len(chunk))  # Graph counts every request inside a batch
+            API_REQUESTS.inc("OUTLOOK", account)
+            async with http.post(f"{GRAPH_URL}/$batch", headers=headers, json=body) as res:
+                if res.status >= 400:
+                    API_ERRORS.inc("OUTLOOK", account, res.status)
+                    retry_after = float(res.headers.get("Retry-After") or DEFAULT_RETRY_AFTER) if res.status in (429, 503) else None
+                    raise GraphApiError(res.status, (await res.text())[:200], retry_after)
+                responses = (await res.json()).get("responses", [])
+
+            for response in responses:
+                mailbox = chunk[int(response["id"])][0]
+                status = response.get("status", 500)
+                data = response.get("body") or {}
+                if status >= 400:
+                    API_ERRORS.inc("OUTLOOK", mailbox, status)
+                if status == 410:  # delta link no longer valid
+                    results[mailbox]["expired"] = True
+                    continue
+                if status in (429, 503):
+                    retry_after = (response.get("headers") or {}).get("Retry-After") or DEFAULT_RETRY_AFTER
+                    results[mailbox]["retry_after"] = float(retry_after)
+                    continue
+                if status >= 400:
+                    error = data.get("error", {}).get("message", status)
+                    console.print(f"❌ Outlook API Error ({mailbox}): {error}", style="red")
+                    continue
+
+                for mail in data.get("value", []):
+                    if "@removed" in mail or mail.get("isRead"):
+                        continue
+                    results[mailbox]["emails"].append(format_message(mail, mailbox))
 
-    mails = res.json().get("value", [])
-    formatted = []
-    for mail in mails:
-        sender = mail.get("from", {}).get("emailAddress", {}).get("address", "(unknown)")
-        formatted.append({
-            "sender": sender,
-            "subject": mail.get("subject", "(no subject)"),
-            "received": mail.get("receivedDateTime")
-        })
-    return formatted
+                if "@odata.nextLink" in data:
+                    pending[mailbox] = relative_url(data["@odata.nextLink"])
+                else:
+                    results[mailbox]["delta_link"] = data.get("@odata.deltaLink")
 
+    return results
 
-# ===== SYNCHRONOUS MONITOR (for callback + executor in main.py) =====
-def monitor_new_outlook_emails(callback, client_id, tenant_id=None, interval=60, max_results=10):
+
+# ===== MESSAGE DETAIL (on demand) =====
+def format_recipients(recipients):
+    return ", ".join(
+        f"{r['emailAddress'].get('name')} <{r['emailAddress'].get('address')}>" if r["emailAddress"].get("name")
+        else r["emailAddress"].get("address", "")
+        for r in recipients or [] if r.get("emailAddress")
+    ) or None
+
+async def fetch_message_detail(http, access_token, mailbox, signin, message_id):
     """
-    Polls Outlook for unread emails in a loop and calls the callback for each new email.
-    Designed to be run in a ThreadPoolExecutor for async usage.
+    Body (as plain text, via the Prefer header) and attachment names of one message.
+    Only called when a message is opened; delta polling never downloads bodies.
     """
-    seen_email_ids = set()
-    sleep(3)
-    while True:
-        token = acquire_token(client_id, tenant_id)
-        if token and "access_token" in token:
-            access_token = token["access_token"]
-            emails = fetch_unread_emails_structured(access_token, max_results=max_results)
-
-            for email in emails:
-                email_id = f"{email['sender']}-{email['received']}"
-                if email_id not in seen_email_ids:
-                    seen_email_ids.add(email_id)
-                    callback(email)
-        else:
-            console.print("❌ Failed to acquire Outlook token.", style="bold red")
-
-        sleep(interval)
+    url = f"{GRAPH_URL}{mailbox_path(mailbox, signin)}/messages/{quote(message_id, safe='')}"
+    params = {"$select": DETAIL_FIELDS, "$expand": "attachments($select=name)"}
+    headers = {"Authorization": f"Bearer {access_token}", "Prefer": 'outlook.body-content-type="text"'}
+    API_REQUESTS.inc("OUTLOOK", signin)
+    async with http.get(url, params=params, headers=headers) as res:
+        if res.status >= 400:
+            API_ERRORS.inc("OUTLOOK", signin, res.status)
+            raise GraphApiError(res.status, (await res.text())[:200])
+        mail = await res.json()
+
+    return {
+        "subject": mail.get("subject"),
+        "from": format_recipients([mail["from"]]) if mail.get("from") else None,
+        "to": format_recipients(mail.get("toRecipients")),
+        "cc": format_recipients(mail.get("ccRecipients")),
+        "date": mail.get("receivedDateTime"),
+        "body": (mail.get("body") or {}).get("content", "").strip(),
+        "attachments": [attachment.get("name") for attachment in mail.get("attachments", [])],
+    }
+
+
+async def open_message(http, token_manager, signin, mailbox, message_id):
+    """fetch_message_detail with `signin`'s token (the fetcher registered with pipeline.details)."""
+    token = await token_manager.get_token_async(signin)
+    if not (token and "access_token" in token):
+        raise GraphApiError(401, f"Failed to acquire Outlook token for {signin or 'Outlook'}")
+    signin = signin or token.get("id_token_claims", {}).get("preferred_username")
+    return await fetch_message_detail(http, token["access_token"], mailbox or signin, signin, message_id)
+
+
+# ===== POLLING (driven by pipeline.scheduler) =====
+async def poll_outlook_account(http, token_manager, signin, mailboxes, callback, page_size=DELTA_PAGE_SIZE, budget=None):
+    """
+    One delta round for every mailbox readable with `signin`'s token (a single $batch call).
+    Awaits `callback` for each new email and returns how many there were;
+    token failures and throttling raise so the scheduler can back off.
+    """
+    store = get_store()
+    token = await token_manager.get_token_async(signin)
+    if not (token and "access_token" in token):
+        raise GraphApiError(401, f"Failed to acquire Outlook token for {signin or 'Outlook'}")
+
+    signin = signin or token.get("id_token_claims", {}).get("preferred_username")
+    delta_links = {}
+    for mailbox in [signin] + (mailboxes or {}).get(signin, []):
+        delta_links[mailbox] = (
+            store.get_checkpoint(f"outlook:delta:{mailbox}")
+            or initial_delta_url(mailbox_path(mailbox, signin))
+        )
+
+    results = await batch_delta_sync(http, token["access_token"], delta_links, page_size=page_size, budget=budget, account=signin)
+    new_count = 0
+    throttled = []
+    for mailbox, result in results.items():
+        delta_key = f"outlook:delta:{mailbox}"
+        if result["expired"]:
+            console.print(f"⚠ Outlook delta link expired for {mailbox}, resyncing.", style="yellow")
+            store.set_checkpoint(delta_key, None)
+        elif result["delta_link"]:
+            store.set_checkpoint(delta_key, result["delta_link"])
+        if result["retry_after"]:
+            throttled.append(result["retry_after"])
+
+        seen_email_ids = store.view(f"outlook:{mailbox}")
+        for email in result["emails"]:
+            if email.message_id not in seen_email_ids:
+                seen_email_ids.add(email.message_id)
+                new_count += 1
+                await callback(email)
+
+    if throttled:
+        raise GraphApiError(429, f"{len(throttled)} mailbox(es) throttled", max(throttled))
+    return new_count
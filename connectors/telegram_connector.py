@@ -1,8 +1,15 @@
 import os
+import time
 import asyncio
+from collections import OrderedDict
 from telethon import TelegramClient, events
 from telethon.tl.types import MessageService
-from display.terminal_display import Console,display_message
+from display.terminal_display import Console,display_message,log_warning
+from display.render_queue import RenderQueue
+from storage.dedup_store import get_store
+from pipeline.filters import load_filter
+from pipeline.ingest import Ingest
+from pipeline.message import FeedMessage
 
 
 def login(): # If .session file is lost
@@ -17,93 +24,202 @@ def login(): # If .session file is lost
     with client:
         client.loop.run_until_complete(main())
 
-# Put the chat IDs of the groups/chats you want to monitor
+# ===== SENDER CACHE =====
+SENDER_CACHE_SIZE = 10_000   # resolved sender names kept in memory
+SENDER_TTL = 6 * 3600        # names older than this are refreshed in the background
+PREWARM_LIMIT = 1_000        # participants loaded per monitored chat at startup
+RESOLVE_CONCURRENCY = 10     # chat entities / participant lists fetched in parallel at startup
+
+def format_sender_name(sender):
+    if sender is None:
+        return "Unknown"
+    if getattr(sender, "username", None):
+        return sender.username
+    if hasattr(sender, "title"):  # channel / anonymous group admin posting as the chat
+        return sender.title
+    return f"{getattr(sender, 'first_name', None) or ''} {getattr(sender, 'last_name', None) or ''}".strip() or str(sender.id)
+
+class SenderCache:
+    """
+    LRU of sender display names keyed by user ID. Stale names are still served
+    immediately and refreshed in the background, so the handler rarely waits on Telegram.
+    """
+
+    def __init__(self, maxsize=SENDER_CACHE_SIZE, ttl=SENDER_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._names = OrderedDict()  # user_id -> (name, fetched_at)
+        self._refreshing = {}  # user_id -> background refresh task
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, user_id, name):
+        self._names[user_id] = (name, time.monotonic())
+        self._names.move_to_end(user_id)
+        if len(self._names) > self.maxsize:
+            self._names.popitem(last=False)
+
+    async def resolve(self, msg):
+        user_id = msg.sender_id
+        if user_id is None:  # no sender ID (e.g. some channel posts): nothing to key the cache on
+            return format_sender_name(msg.sender or await msg.get_sender())
+        cached = self._names.get(user_id)
+        if cached:
+            self.hits += 1
+            self._names.move_to_end(user_id)
+            name, fetched_at = cached
+            if time.monotonic() - fetched_at > self.ttl and user_id not in self._refreshing:
+                self._refreshing[user_id] = asyncio.create_task(self._refresh(msg))
+            return name
+
+        self.misses += 1
+        # Entities shipped with the update cost nothing; only fall back to a lookup without them
+        sender = msg.sender or await msg.get_sender()
+        name = format_sender_name(sender)
+        self.put(user_id, name)
+        return name
+
+    async def _refresh(self, msg):
+        try:
+            self.put(msg.sender_id, format_sender_name(await msg.get_sender()))
+        except Exception:
+            pass  # keep serving the old name; retried after the next hit
+        finally:
+            self._refreshing.pop(msg.sender_id, None)
+
+    async def prewarm(self, client, chat_ids, limit=PREWARM_LIMIT, concurrency=RESOLVE_CONCURRENCY):
+        """
+        Load participant names of the monitored chats, at most `concurrency` chats at a time
+        (so many chats do not trigger FloodWait). Chats we cannot list are logged and skipped.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def load(chat_id):
+            async with semaphore:
+                try:
+                    async for user in client.iter_participants(chat_id, limit=limit):
+                        self.put(user.id, format_sender_name(user))
+                except Exception as e:
+                    # Broadcast channels / no admin rights: names get cached on first message instead
+                    log_warning(f"⚠ Telegram: could not prewarm sender names for chat {chat_id}: {type(e).__name__}: {e}")
+
+        await asyncio.gather(*(load(chat_id) for chat_id in chat_ids))
 
-last_seen = {}
-def is_likely_advert(msg_text):
-    if not msg_text:
-        return True
-    if "http://" in msg_text or "https://" in msg_text or "bit.ly" in msg_text:
-        return True
-    if msg_text.count("\n") > 5:
-        return True
-    return False
+# Put the chat IDs of the groups/chats you want to monitor
 
 async def get_chat_name(client,chat_id):
     entity = await client.get_entity(chat_id)
     return entity.title if hasattr(entity, "title") else entity.username or str(entity.id)
 
-def create_telegram_client(api_id, api_hash, target_chat_ids):
-    client = TelegramClient("session_name", api_id, api_hash)
+async def resolve_chat_names(client, chat_ids, concurrency=RESOLVE_CONCURRENCY):
+    """
+    Resolve chat names concurrently (at most `concurrency` in flight), persisting each one.
+    Yields (chat_id, name) as they complete; failures yield "<error: ...>" and are not saved.
+    """
+    store = get_store()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def resolve(chat_id):
+        async with semaphore:
+            try:
+                name = await get_chat_name(client, chat_id)
+            except Exception as e:
+                return chat_id, f"<error: {e}>"
+        store.set_checkpoint(f"telegram:chat_name:{chat_id}", name)
+        return chat_id, name
+
+    for next_done in asyncio.as_completed([resolve(chat_id) for chat_id in chat_ids]):
+        yield await next_done
+
+async def revalidate_chat_names(client, chat_ids):
+    """Background refresh of names that were served from the on-disk cache."""
+    async for _ in resolve_chat_names(client, chat_ids):
+        pass
+
+def make_message_handler(output=None, sender_cache=None):
+    """
+    NewMessage handler: skips service messages and duplicates, resolves the sender
+    and hands a FeedMessage to `output` (anything with an async put(message):
+    a local RenderQueue or the EventChannel into the main aggregator).
+    """
+    sender_cache = sender_cache or SenderCache()
+    store = get_store()
 
-    @client.on(events.NewMessage(chats=target_chat_ids))
     async def tg_handler(event):
         msg = event.message
         if isinstance(msg, MessageService):
             return
-        if is_likely_advert(msg.text):
-            return
 
         chat_id = event.chat_id
-        if chat_id in last_seen and msg.id <= last_seen[chat_id]:
+        if not store.check_and_mark(f"telegram:{chat_id}", msg.id):
             return
-        last_seen[chat_id] = msg.id
 
-        sender = await msg.get_sender()
-        sender_name = sender.username or f"{sender.first_name or ''} {sender.last_name or ''}".strip()
+        sender_name = await sender_cache.resolve(msg)
 
-        telegram_data = {
-            "sender": sender_name,
-            "text": msg.text,
-            "chat_id": chat_id
-        }
-        display_message(telegram_data, service_name="TELEGRAM")
+        telegram_message = FeedMessage(
+            "TELEGRAM", msg.id, sender_name,
+            text=msg.text,
+            chat_id=chat_id,
+            timestamp=msg.date.timestamp() if msg.date else time.time()
+        )
+        if output:
+            await output.put(telegram_message)
+        else:
+            display_message(telegram_message)
 
+    return tg_handler
+
+def create_telegram_client(api_id, api_hash, target_chat_ids, output=None, sender_cache=None):
+    client = TelegramClient("session_name", api_id, api_hash)
+    client.add_event_handler(make_message_handler(output, sender_cache), events.NewMessage(chats=target_chat_ids))
     return client
 
-async def monitor_telegram(api_id, api_hash, target_chat_ids):
-    client = create_telegram_client(api_id, api_hash, target_chat_ids)
+async def monitor_telegram(api_id, api_hash, target_chat_ids, channel=None, render_rate=None):
+    """
+    Monitor Telegram chats. With a `channel` (EventChannel), messages are sent to the
+    main aggregator process; otherwise they are rendered locally.
+    """
+    render_queue = None if channel else RenderQueue(rate=render_rate)
+    # The aggregator filters events arriving through the channel; standalone runs filter here
+    output = channel or Ingest(load_filter(), [render_queue])
+    sender_cache = SenderCache()
+    client = create_telegram_client(api_id, api_hash, target_chat_ids, output, sender_cache)
     await client.start()
     console = Console()
     console.print("\n> Initializing Telegram monitor...", style="bold magenta")
     console.print("[bright_black]Scanning target chats...[/bright_black]")
+    # Fill the sender-name cache in the background while chats are resolved
+    # (task references are kept in locals so they are not garbage collected)
+    prewarm_task = asyncio.create_task(sender_cache.prewarm(client, target_chat_ids))
 
-    for cid in target_chat_ids:
-        # start fetching name concurrently
-        fetch_task = asyncio.create_task(get_chat_name(client, cid))
-
-        # animate a short dot-progress on the same line while waiting
-        dots_cycle = [" .  ", " .. ", " ...", " .. "]
-        dot_index = 0
-        # print initial resolving line (no newline so we can overwrite)
-        console.print(f"[bright_green]→[/bright_green] [bright_black]Resolving{dots_cycle[dot_index]}[/bright_black]", end="\r")
-
-        # loop until fetch_task completes; animate quickly
-        while not fetch_task.done():
-            await asyncio.sleep(0.06)            # small delay to keep it snappy
-            dot_index = (dot_index + 1) % len(dots_cycle)
-            console.print(f"[bright_green]→[/bright_green] [bright_black]Resolving{dots_cycle[dot_index]}[/bright_black]", end="\r")
-
-        # when done, get the result and print final resolved line
-        try:
-            name = fetch_task.result()
-        except Exception as e:
-            name = f"<error: {e}>"
-
-        # clear the resolving line and print the final styled line
-        # printing a padded blank line first avoids leftover characters from shorter strings
-        clear_padding = " " * 40
-        console.print(f"{clear_padding}", end="\r")  # clear
+    def print_chat(name, note):
         console.print(
             f"[bright_green]→[/bright_green] [bold white]{name}[/bold white] "
-            f"[bright_black]• resolved[/bright_black]"
+            f"[bright_black]• {note}[/bright_black]"
         )
 
-        # tiny stagger so lines don't all appear at once
-        await asyncio.sleep(0.04)
+    # Names cached from the last run show instantly and are revalidated in the background
+    store = get_store()
+    cached, missing = [], []
+    for cid in target_chat_ids:
+        name = store.get_checkpoint(f"telegram:chat_name:{cid}")
+        if name:
+            cached.append(cid)
+            print_chat(name, "cached")
+        else:
+            missing.append(cid)
+    revalidate_task = asyncio.create_task(revalidate_chat_names(client, cached)) if cached else None
+
+    # Everything else resolves concurrently behind one spinner
+    if missing:
+        with console.status(f"[bright_black]Resolving {len(missing)} chats...[/bright_black]", spinner="dots"):
+            async for cid, name in resolve_chat_names(client, missing):
+                print_chat(name, "resolved")
 
     console.print("\n[bright_black]Scan complete. Monitoring started...[/bright_black]\n")
     console.rule("[bold green]•[/bold green]")
+    if render_queue:
+        render_queue.start()
     # Run the live monitor
     await client.run_until_disconnected()
 
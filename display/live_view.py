@@ -0,0 +1,382 @@
+import io
+import os
+import sys
+import time
+import asyncio
+import threading
+from collections import deque
+from rich.console import Console, Group
+from rich.layout import Layout
+from rich.live import Live
+from rich.panel import Panel
+from rich.text import Text
+from display.terminal_display import console, SERVICE_COLORS, CONTENT_COLORS
+from pipeline.metrics import RENDER_SECONDS
+
+# ===== CONFIG =====
+DEFAULT_CAPACITY = 10_000   # messages kept per view (older ones fall off the ring buffer)
+DEFAULT_FPS = 10            # max redraws per second, however fast messages arrive
+IDLE_REDRAW = 1.0           # redraw at least this often (clock, terminal resizes)
+LOG_LINES = 3               # log / stats lines shown under the feed
+SOURCES = ("GMAIL", "OUTLOOK", "TELEGRAM")
+
+HELP = "a all · g/o/t source · p panes · / filter · esc clear · ↑↓ PgUp PgDn scroll · end live · enter open"
+DETAIL_HELP = "↑↓ PgUp PgDn scroll · esc / enter back"
+
+# Escape sequences (POSIX terminals) / scan codes (Windows getwch) for the keys we use
+ESCAPE_KEYS = {
+    "\x1b[A": "up", "\x1b[B": "down", "\x1b[5~": "pgup", "\x1b[6~": "pgdn",
+    "\x1b[H": "home", "\x1b[1~": "home", "\x1b[F": "end", "\x1b[4~": "end",
+}
+WINDOWS_KEYS = {"H": "up", "P": "down", "I": "pgup", "Q": "pgdn", "G": "home", "O": "end"}
+
+
+def render_line(message):
+    """One terminal row per message: time, source, (mailbox,) sender >> content."""
+    colors = CONTENT_COLORS.get(message.source, CONTENT_COLORS["GMAIL"])
+    line = Text(no_wrap=True, overflow="ellipsis")
+    line.append(time.strftime("%H:%M:%S ", time.localtime(message.timestamp or time.time())), style="bright_black")
+    line.append(f"[{message.source}] ", style=f"bold {SERVICE_COLORS.get(message.source, 'green')}")
+    if message.is_email and message.account:
+        line.append(f"{message.account} ", style="bright_magenta")
+    line.append(message.sender_name or "", style=colors["field1"])
+    line.append("  >>  ")
+    line.append(" ".join(message.content.split()), style=colors["field3"])
+    return line
+
+
+class LogCapture(io.TextIOBase):
+    """Stands in for the shared console's file while the live view owns the screen (keeps the last lines, ANSI styled)."""
+
+    def __init__(self, lines, on_write):
+        self.lines = lines
+        self.on_write = on_write
+
+    def write(self, text):
+        for line in text.splitlines():
+            if line.strip():
+                self.lines.append(line)
+        self.on_write()
+        return len(text)
+
+    def isatty(self):
+        return False
+
+
+class LiveView:
+    """
+    Full-screen feed (`python main.py --tui`), an Ingest consumer like the RenderQueue.
+
+    Messages go into fixed-size ring buffers (all messages + one per source), so memory
+    stays flat however long it runs. A single task redraws only the rows that fit the
+    screen, at most `fps` times per second and only when something changed. The view
+    can be narrowed to one source or a text filter, split into per-source panes, and
+    scrolled back through the buffer; Enter opens the highlighted message (body fetched
+    on demand through `details`). Log lines printed meanwhile show under the feed.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, fps=DEFAULT_FPS, details=None):
+        self.capacity = capacity
+        self.fps = fps
+        self.details = details  # pipeline.details.MessageDetails (Enter opens the bottom row)
+        self.buffers = {None: deque(maxlen=capacity)}
+        self.received = 0
+        self.logs = deque(maxlen=LOG_LINES)
+
+        # View state (only touched on the event loop)
+        self.source = None      # None = every source
+        self.panes = False      # one column per source
+        self.query = ""         # case-insensitive substring filter
+        self.typing = None      # filter being typed after "/"
+        self.offset = 0         # rows scrolled back from the newest (0 = follow live)
+        self.opened = None      # {"message", "detail", "error"} while a message is open
+        self.detail_offset = 0
+
+        self.screen = Console(file=sys.stdout)
+        self.loop = None
+        self._dirty = None
+        self._task = None
+        self._closed = threading.Event()
+        self._saved_file = None
+        self._keys_thread = None
+        self._saved_tty = None     # termios settings to restore (POSIX key reader)
+        self._detail_tasks = set()
+
+    # ----- producer -----
+    async def put(self, message):
+        self.buffers[None].append(message)
+        if message.source not in self.buffers:
+            self.buffers[message.source] = deque(maxlen=self.capacity)
+        self.buffers[message.source].append(message)
+        self.received += 1
+        if self.offset and self._in_view(message):
+            self.offset += 1  # keep a scrolled-back window still while new messages arrive
+        if self._dirty:  # not started yet (sign-in still running): just buffer
+            self._dirty.set()
+
+    def depth(self):
+        return 0
+
+    # ----- view -----
+    def _matches(self, message, query):
+        return not query or query in f"{message.sender} {message.content}".lower()
+
+    def _in_view(self, message):
+        return (self.panes or self.source in (None, message.source)) and self._matches(message, self.query.lower())
+
+    def window(self, source, rows):
+        """The `rows` newest matching messages (after skipping `offset`), oldest first."""
+        query = self.query.lower()
+        skip = self.offset
+        messages = []
+        for message in reversed(self.buffers.get(source, ())):
+            if not self._matches(message, query):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            messages.append(message)
+            if len(messages) == rows:
+                break
+        messages.reverse()
+        return messages
+
+    def lines(self, source, rows):
+        lines = [render_line(message) for message in self.window(source, rows)]
+        if lines and self.offset and not self.panes:
+            lines[-1].stylize("reverse")  # the row Enter opens
+        return lines
+
+    def detail_panel(self, rows):
+        message, detail = self.opened["message"], self.opened["detail"]
+        text = Text()
+        if self.opened["error"]:
+            text.append(f"❌ Could not open message: {self.opened['error']}\n", style="bold red")
+            detail = detail or {}
+        elif detail is None:
+            text.append("Loading…\n", style="bright_black")
+            detail = {}
+        for label in ("from", "to", "cc", "date", "subject"):
+            if detail.get(label):
+                text.append(f"{label.title():>8}: ", style="bold bright_magenta")
+                text.append(f"{detail[label]}\n")
+        if detail.get("attachments"):
+            text.append(" 📎 " + ", ".join(detail["attachments"]) + "\n", style="yellow")
+        body = (detail.get("body") or "").splitlines()
+        self.detail_offset = min(self.detail_offset, max(len(body) - 1, 0))
+        text.append("\n" + "\n".join(body[self.detail_offset:self.detail_offset + rows]))
+        title = f"[{message.source}] {message.account or message.chat_id} · {message.message_id}"
+        return Panel(text, title=title, border_style=SERVICE_COLORS.get(message.source, "green"))
+
+    def header(self):
+        counts = " · ".join(f"{source} {len(self.buffers[source])}" for source in SOURCES if source in self.buffers)
+        header = Text(no_wrap=True, overflow="ellipsis")
+        header.append("📨 intra-feed ", style="bold cyan")
+        header.append(f"[{'panes' if self.panes else self.source or 'ALL'}] ", style="bold white")
+        if self.typing is not None:
+            header.append(f"filter: {self.typing}▏ ", style="bold yellow")
+        elif self.query:
+            header.append(f"filter: {self.query!r} ", style="yellow")
+        header.append(f"{counts or 'waiting for messages'} (buffer {self.capacity}) ", style="bright_black")
+        header.append(f"▲ {self.offset} back" if self.offset else "● live", style="bold red" if self.offset else "bold green")
+        return header
+
+    def render(self):
+        height, width = self.screen.size.height, self.screen.size.width
+        # Log lines wrap, so a device-login URL and code are shown in full
+        footer = [Text.from_ansi(line, overflow="fold") for line in self.logs]
+        footer_rows = min(sum(len(line.wrap(self.screen, width)) for line in footer) + 1, max(1, height // 2))
+        footer.append(Text(DETAIL_HELP if self.opened else HELP, no_wrap=True, overflow="ellipsis", style="dim"))
+        rows = max(1, height - 1 - footer_rows)
+
+        if self.opened:
+            body = self.detail_panel(rows)
+        elif self.panes:
+            body = Layout()
+            body.split_row(*(
+                Layout(Panel(Group(*self.lines(source, max(1, rows - 2))), title=source,
+                             border_style=SERVICE_COLORS[source]))
+                for source in SOURCES
+            ))
+        else:
+            body = Group(*self.lines(self.source, rows))
+
+        layout = Layout()
+        layout.split_column(
+            Layout(self.header(), size=1),
+            Layout(body, size=rows),
+            Layout(Group(*footer), size=footer_rows),
+        )
+        return layout
+
+    # ----- message detail -----
+    def open_selected(self):
+        """Open the bottom row of the current view (the newest message while following live)."""
+        selected = self.window(self.source, 1)
+        if not selected or self.panes:
+            return
+        self.opened = {"message": selected[0], "detail": None, "error": None}
+        self.detail_offset = 0
+        task = asyncio.create_task(self._load_detail(self.opened))
+        self._detail_tasks.add(task)
+        task.add_done_callback(self._detail_tasks.discard)
+
+    async def _load_detail(self, opened):
+        from pipeline.details import local_detail
+        try:
+            opened["detail"] = await self.details.open(opened["message"]) if self.details else local_detail(opened["message"])
+        except Exception as e:
+            opened["error"] = str(e) or type(e).__name__
+        self._dirty.set()
+
+    def on_detail_key(self, key):
+        page = self.screen.size.height // 2
+        if key in ("esc", "q", "\r", "\n", "\x7f", "\b"):
+            self.opened = None
+        elif key in ("up", "k"):
+            self.detail_offset = max(self.detail_offset - 1, 0)
+        elif key in ("down", "j"):
+            self.detail_offset += 1
+        elif key == "pgup":
+            self.detail_offset = max(self.detail_offset - page, 0)
+        elif key in ("pgdn", " "):
+            self.detail_offset += page
+        elif key == "home":
+            self.detail_offset = 0
+        self._dirty.set()
+
+    # ----- keys -----
+    def on_key(self, key):
+        if self.opened:
+            return self.on_detail_key(key)
+        if self.typing is not None:
+            if key in ("\r", "\n"):
+                self.query, self.typing = self.typing, None
+                self.offset = 0
+            elif key == "esc":
+                self.typing = None
+            elif key in ("\x7f", "\b"):
+                self.typing = self.typing[:-1]
+            elif len(key) == 1 and key.isprintable():
+                self.typing += key
+        elif key in ("a", "g", "o", "t"):
+            self.source = {"a": None, "g": "GMAIL", "o": "OUTLOOK", "t": "TELEGRAM"}[key]
+            self.panes = False
+            self.offset = 0
+        elif key == "p":
+            self.panes = not self.panes
+            self.offset = 0
+        elif key == "/":
+            self.typing = ""
+        elif key == "esc":
+            self.query = ""
+            self.offset = 0
+        elif key in ("up", "k"):
+            self.offset = min(self.offset + 1, len(self.buffers[None]))
+        elif key in ("down", "j"):
+            self.offset = max(self.offset - 1, 0)
+        elif key == "pgup":
+            self.offset = min(self.offset + self.screen.size.height // 2, len(self.buffers[None]))
+        elif key == "pgdn":
+            self.offset = max(self.offset - self.screen.size.height // 2, 0)
+        elif key == "home":
+            self.offset = len(self.buffers[None])
+        elif key in ("end", "G", " "):
+            self.offset = 0
+        elif key in ("\r", "\n"):
+            self.open_selected()
+        self._dirty.set()
+
+    def _emit_key(self, key):
+        if key:
+            self.loop.call_soon_threadsafe(self.on_key, key)
+
+    def _read_keys(self):
+        """Key reader thread: cbreak stdin on POSIX (Ctrl+C still interrupts), getwch on Windows."""
+        if os.name == "nt":
+            import msvcrt
+            while not self._closed.is_set():
+                if not msvcrt.kbhit():
+                    time.sleep(0.05)
+                    continue
+                key = msvcrt.getwch()
+                if key in ("\x00", "\xe0"):
+                    key = WINDOWS_KEYS.get(msvcrt.getwch())
+                self._emit_key("esc" if key == "\x1b" else key)
+            return
+
+        import select
+        import termios
+        import tty
+        fd = sys.stdin.fileno()
+        saved = self._saved_tty = termios.tcgetattr(fd)
+        tty.setcbreak(fd)
+        try:
+            while not self._closed.is_set():
+                if not select.select([fd], [], [], 0.2)[0]:
+                    continue
+                data = os.read(fd, 64).decode("utf-8", errors="ignore")
+                while data:
+                    if data.startswith("\x1b["):
+                        end = next((i for i, ch in enumerate(data[2:], 2) if ch.isalpha() or ch == "~"), len(data) - 1)
+                        key, data = ESCAPE_KEYS.get(data[:end + 1]), data[end + 1:]
+                    elif data[0] == "\x1b":
+                        key, data = "esc", data[1:]
+                    else:
+                        key, data = data[0], data[1:]
+                    self._emit_key(key)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+    # ----- renderer -----
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self._dirty = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self):
+        # Everything printed on the shared console (logs, stats line) goes to the footer instead
+        self._saved_file = console.file
+        console.file = LogCapture(self.logs, lambda: self.loop.call_soon_threadsafe(self._dirty.set))
+        if sys.stdin.isatty():
+            self._keys_thread = threading.Thread(target=self._read_keys, name="live-view-keys", daemon=True)
+            self._keys_thread.start()
+
+        with Live(console=self.screen, screen=True, auto_refresh=False,
+                  redirect_stdout=False, redirect_stderr=False) as live:
+            while True:
+                try:
+                    await asyncio.wait_for(self._dirty.wait(), IDLE_REDRAW)
+                except asyncio.TimeoutError:
+                    pass
+                self._dirty.clear()
+                started = time.perf_counter()
+                live.update(self.render(), refresh=True)
+                RENDER_SECONDS.observe(time.perf_counter() - started)
+                await asyncio.sleep(1 / self.fps)
+
+    def _restore_terminal(self):
+        """Wait for the key reader to put the terminal back out of cbreak mode (or do it here)."""
+        if self._keys_thread:
+            self._keys_thread.join(1)
+            self._keys_thread = None
+        if self._saved_tty is not None and os.name != "nt":
+            import termios
+            termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, self._saved_tty)
+            self._saved_tty = None
+
+    async def stop(self):
+        self._closed.set()
+        for task in self._detail_tasks:
+            task.cancel()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._saved_file is not None:
+            console.file = self._saved_file
+            self._saved_file = None
+        self._restore_terminal()
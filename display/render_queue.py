@@ -0,0 +1,102 @@
+import time
+import asyncio
+from display.terminal_display import RENDER_ENGINE, log_warning
+from pipeline.metrics import RENDER_SECONDS, RENDERED
+
+# ===== CONFIG =====
+DEFAULT_MAXSIZE = 1000      # messages buffered before producers have to wait
+DEFAULT_BATCH_SIZE = 50     # messages coalesced into one terminal write
+HIGH_WATER_RATIO = 0.8      # warn when the queue is this full
+
+
+class RenderQueue:
+    """
+    Bounded async queue between connectors and the terminal.
+
+    Producers only enqueue (`await put(...)`). A single renderer task drains the queue
+    in batches and writes each batch with one terminal write (see RenderEngine). Optional
+    pacing (`rate`, messages/sec) only slows the renderer; producers wait only if the queue is full.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, batch_size=DEFAULT_BATCH_SIZE, rate=None):
+        self.maxsize = maxsize
+        self.rate = rate
+        # When pacing, write at most ~1s worth of messages at a time
+        self.batch_size = max(1, min(batch_size, int(rate))) if rate else batch_size
+        self.queue = asyncio.Queue(maxsize)
+        self._task = None
+        self._warned = False
+
+        # Stats
+        self.rendered = 0
+        self.batches = 0
+        self.high_water = 0
+
+    # ----- producers -----
+    async def put(self, message):
+        await self.queue.put(message)
+        self._track_depth()
+
+    def _track_depth(self):
+        depth = self.queue.qsize()
+        self.high_water = max(self.high_water, depth)
+        if depth >= self.maxsize * HIGH_WATER_RATIO:
+            if not self._warned:
+                log_warning(f"⚠ Display queue backing up: {depth}/{self.maxsize} messages waiting")
+                self._warned = True
+        elif depth == 0:
+            self._warned = False
+
+    # ----- renderer -----
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            self._render(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+            if self.rate:
+                await asyncio.sleep(len(batch) / self.rate)
+            else:
+                await asyncio.sleep(0)  # let producers run between batches
+
+    def _render(self, batch):
+        started = time.perf_counter()
+        RENDER_ENGINE.write(batch)  # the whole batch in a single terminal write
+        RENDER_SECONDS.observe(time.perf_counter() - started)
+        RENDERED.inc(amount=len(batch))
+        self.rendered += len(batch)
+        self.batches += 1
+
+    async def drain(self):
+        """Wait until everything queued so far has been rendered."""
+        await self.queue.join()
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def stats(self):
+        return {
+            "depth": self.depth(),
+            "high_water": self.high_water,
+            "rendered": self.rendered,
+            "batches": self.batches,
+        }
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
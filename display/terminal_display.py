@@ -1,6 +1,5 @@
-import re
-import time
-from rich.console import Console
+from rich.console import Console, COLOR_SYSTEMS
+from rich.style import Style
 from rich.text import Text
 
 console = Console()
@@ -35,68 +34,151 @@ CONTENT_COLORS = {
         "field3": "bright_white"     
     },
 }
-def display_message(message_data, service_name="SERVICE", pause=1):
+def render_message(message):
     """
-    Generalized display for multiple services.
-    Assumes message_data has 3 fields:
-      - field1: sender / username
-      - field2: email / chat_id
-      - field3: subject / text
-    Only prints `account` if service is an email type (GMAIL or OUTLOOK).
+    Build the renderables (message line + separator) for one FeedMessage.
+    Shows:
+      - sender name
+      - sender address / chat_id
+      - subject / text
+    Only prints `account` if the source is an email type (GMAIL or OUTLOOK).
+    Rich fallback for RENDER_ENGINE (legacy Windows consoles, which do not take ANSI codes).
     """
-    # Extract fields
-    fields0_raw = message_data.get("account", "NIL")
-    field1_raw = message_data.get("sender", "Unknown")
-    field2_raw = message_data.get("email") or str(message_data.get("chat_id", "N/A"))
-    field3_raw = message_data.get("subject") or message_data.get("text") or "(No Content)"
-    field4_raw = message_data.get("timestamp", "NIL")
+    service_name = message.source
+    sender_detail = message.sender_address or (str(message.chat_id) if message.chat_id is not None else "N/A")
+    display_time = message.display_time()
 
     # Determine colors
-    service_color = SERVICE_COLORS.get(service_name.upper(), "green")
-    content_colors = CONTENT_COLORS.get(service_name.upper(), CONTENT_COLORS["GMAIL"])
-
-    # Attempt to parse email if applicable
-    sender_name = field1_raw
-    sender_email = field2_raw
-    m = re.match(r'^(?P<name>.*?)\s*<(?P<email>[^>]+)>$', field1_raw.strip())
-    if m:
-        sender_name = m.group("name").strip() or "Unknown"
-        sender_email = m.group("email").strip()
-
-    MAX_MSG_WIDTH = 120  # width of main message before timestamp
+    service_color = SERVICE_COLORS.get(service_name, "green")
+    content_colors = CONTENT_COLORS.get(service_name, CONTENT_COLORS["GMAIL"])
 
     # Build Rich text
     line = Text()
     line.append(f"[{service_name}] ", style=f"bold {service_color}")
 
     # Add Email Account line if it's email service
-    if service_name.upper() in ["GMAIL", "OUTLOOK"]:
-        if field4_raw != "NIL":
-            line.append(f"Email Acct: {fields0_raw} [", style="bold bright_magenta")
-            line.append(f"{field4_raw}", style="bold white")
+    if message.is_email:
+        if display_time:
+            line.append(f"Email Acct: {message.account} [", style="bold bright_magenta")
+            line.append(display_time, style="bold white")
             line.append("]\n", style="bold bright_magenta")
         else:
-            line.append(f"Email Acct: {fields0_raw}\n", style="bold bright_magenta")
+            line.append(f"Email Acct: {message.account}\n", style="bold bright_magenta")
+
+    # Main message part
+    line.append(message.sender_name, style=content_colors["field1"])
+    if sender_detail:
+        line.append(f" <{sender_detail}>", style=content_colors["field2"])
+    line.append("  >>  ")
+    line.append(message.content, style=content_colors["field3"])
+
+    return line, Text("-" * console.width, style="dim green")
+
+
+# ------------------ Render Engine ------------------
+
+# C0/C1 control characters (incl. ESC) are dropped from message fields so a message
+# cannot move the cursor or restyle the terminal; newlines in bodies are kept.
+CONTROL_CHARS = dict.fromkeys([*range(0x00, 0x20), *range(0x7f, 0xa0)])
+del CONTROL_CHARS[ord("\n")]
 
 
-    # Build main message part
-    main_msg = Text()
-    main_msg.append(sender_name, style=content_colors["field1"])
-    if sender_email:
-        main_msg.append(f" <{sender_email}>", style=content_colors["field2"])
-    main_msg.append("  >>  ")
-    main_msg.append(field3_raw, style=content_colors["field3"])
+class ServiceTemplate:
+    """ANSI (start, end) codes for every styled part of one service's message, built once per color system."""
 
-    # Calculate padding to align timestamp
-    msg_len = len(main_msg.plain)
-    if msg_len < MAX_MSG_WIDTH:
-        padding = MAX_MSG_WIDTH - msg_len
-        main_msg.append(" " * padding)
+    __slots__ = ("tag", "account", "time", "name", "detail", "content")
 
-    line.append(main_msg)
+    def __init__(self, service, color_system):
+        content_colors = CONTENT_COLORS.get(service, CONTENT_COLORS["GMAIL"])
 
-    # Print line + separator
-    console.print(line)
-    console.print(Text("-" * 120, style="dim green"))
+        def codes(style):
+            if color_system is None:
+                return "", ""
+            start, _, end = Style.parse(style).render("\0", color_system=color_system).partition("\0")
+            return start, end
 
-    time.sleep(pause)
+        start, end = codes(f"bold {SERVICE_COLORS.get(service, 'green')}")
+        self.tag = f"{start}[{service}] {end}"
+        self.account = codes("bold bright_magenta")
+        self.time = codes("bold white")
+        self.name = codes(content_colors["field1"])
+        self.detail = codes(content_colors["field2"])
+        self.content = codes(content_colors["field3"])
+
+
+class RenderEngine:
+    """
+    Formats FeedMessages straight to ANSI text from precompiled per-service templates
+    (same layout and colors as render_message) and writes a whole batch to the terminal
+    in one write. Separators follow the console width. Templates are rebuilt only if
+    the console's color system changes (e.g. output redirected to a file gets plain text).
+    """
+
+    def __init__(self, target=console):
+        self.console = target
+        self._templates = {}
+        self._color_system = None
+        self._separator = (None, "")  # (width, rendered line)
+
+    def _template(self, service):
+        color_system = COLOR_SYSTEMS.get(self.console.color_system)
+        if color_system is not self._color_system:
+            self._templates.clear()
+            self._color_system = color_system
+        template = self._templates.get(service)
+        if template is None:
+            template = self._templates[service] = ServiceTemplate(service, color_system)
+        return template
+
+    def separator(self):
+        """The dashed line under each message, as wide as the terminal (re-rendered on resize)."""
+        width = self.console.width
+        if self._separator[0] != width:
+            line = "-" * width
+            if self._color_system is not None:
+                line = Style.parse("dim green").render(line, color_system=self._color_system)
+            self._separator = (width, line + "\n")
+        return self._separator[1]
+
+    def format(self, message):
+        t = self._template(message.source)
+        parts = [t.tag]
+        if message.is_email:
+            account = str(message.account).translate(CONTROL_CHARS)
+            display_time = message.display_time()
+            if display_time:
+                parts.append(f"{t.account[0]}Email Acct: {account} [{t.account[1]}"
+                             f"{t.time[0]}{display_time}{t.time[1]}{t.account[0]}]{t.account[1]}\n")
+            else:
+                parts.append(f"{t.account[0]}Email Acct: {account}{t.account[1]}\n")
+
+        sender_detail = message.sender_address or (str(message.chat_id) if message.chat_id is not None else "N/A")
+        parts.append(f"{t.name[0]}{(message.sender_name or '').translate(CONTROL_CHARS)}{t.name[1]}")
+        if sender_detail:
+            parts.append(f"{t.detail[0]} <{sender_detail.translate(CONTROL_CHARS)}>{t.detail[1]}")
+        parts.append(f"  >>  {t.content[0]}{message.content.translate(CONTROL_CHARS)}{t.content[1]}\n")
+        parts.append(self.separator())
+        return "".join(parts)
+
+    def write(self, messages):
+        """Render a batch with one write + flush (rich renderables on legacy Windows consoles)."""
+        if self.console.legacy_windows:
+            with self.console:
+                for message in messages:
+                    self.console.print(*render_message(message), sep="\n")
+            return
+        file = self.console.file
+        file.write("".join(self.format(message) for message in messages))
+        file.flush()
+
+
+RENDER_ENGINE = RenderEngine()
+
+
+def display_message(message):
+    """
+    Generalized display for multiple services.
+    Prints immediately; connectors running inside the aggregator go through
+    display.render_queue.RenderQueue instead so they never wait on the terminal.
+    """
+    RENDER_ENGINE.write([message])
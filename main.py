@@ -1,18 +1,32 @@
+import sys
+from pipeline.startup import PROFILE
+if "--profile-startup" in sys.argv:
+    PROFILE.enable()  # before the other imports, so they are timed too
+
 import os
 import json
 import asyncio
-from multiprocessing import Process
 from pathlib import Path
 from dotenv import load_dotenv
-from connectors.gmail_connector import get_gmail_service, monitor_new_emails
-from connectors.telegram_connector import monitor_telegram,login
-from connectors.outlook_connector import monitor_new_outlook_emails, check_token_and_get_active_email,acquire_token
+# Connectors (Google client libraries, msal, telethon, aiohttp) are imported when their
+# monitor starts, so a source that is not configured costs nothing at startup.
 from display.terminal_display import (
     log_success, log_error, log_warning,
-    display_message,          # your existing function
     Console,
     Text
 )
+from display.render_queue import RenderQueue
+from display.live_view import LiveView
+from pipeline.event_channel import EventChannel
+from pipeline.scheduler import PollScheduler
+from pipeline.filters import load_filter
+from pipeline.ingest import Ingest
+from pipeline.metrics import QUEUE_DEPTH, StatsReporter, start_metrics_server, load_metrics_settings
+from pipeline.sinks import JsonlFileSink, load_sinks
+from pipeline.details import MessageDetails
+from pipeline.supervisor import Supervisor, shard, LOG_FOLDER
+from storage.search_index import IndexWriter
+from storage.archive import ArchiveWriter
 
 load_dotenv()
 ENV_FILE_PATH = Path(".env")
@@ -103,40 +117,132 @@ def load_and_check_env():
 
 # ------------------ Gmail / Outlook Monitor Asyncio ------------------
 
-async def monitor_account(account_email, cred_file, token_file, interval=60):
+async def monitor_account(account_email, cred_file, token_file, http, scheduler, ingest, credentials, details=None):
     """
-    Async wrapper to run synchronous Gmail monitor in an executor.
+    Load one Gmail account's credentials (off-loop, via the credential manager) and register its poller.
     """
-    service = get_gmail_service(cred_file, token_file)
-
-    def callback(email_data):
-        email_data["account"] = account_email
-        display_message(email_data, service_name="GMAIL")
+    from connectors.gmail_connector import GmailClient, poll_new_emails
 
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, monitor_new_emails, service, callback, interval)
+    with PROFILE.phase(f"Gmail credentials: {account_email}"):
+        creds = await credentials.gmail(account_email, cred_file, token_file)
+    if creds is None:
+        return
+    name = f"gmail:{account_email}"
+    client = GmailClient(http, creds, token_file, account_email, budget=scheduler.budget("GMAIL", name))
+    scheduler.add(name, "GMAIL", lambda: poll_new_emails(client, ingest.put))
+    if details:
+        details.register("GMAIL", account_email, client.get_message_detail)
 
-async def monitor_outlook(outlook_email,client_id, tenant_id, interval=60, max_results=10):
+async def monitor_outlook(outlook_accounts, client_id, tenant_id, http, scheduler, ingest, credentials, mailboxes=None, details=None):
     """
-    Async wrapper to run synchronous Outlook monitor in an executor.
+    Register one Outlook poller per signed-in account (its shared mailboxes ride in the same $batch).
     """
-    def callback(email_data):
-        email_data["account"] = outlook_email
-        display_message(email_data, service_name="OUTLOOK")
-
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(
-        None,
-        monitor_new_outlook_emails,
-        callback,
-        client_id,
-        tenant_id,
-        interval,
-        max_results
-    )
-
-def run_telegram(api_id, api_hash, chat_ids):
-    asyncio.run(monitor_telegram(api_id, api_hash, chat_ids))
+    from connectors.outlook_connector import poll_outlook_account, open_message
+
+    with PROFILE.phase("Outlook tokens"):
+        token_manager, signins = await credentials.outlook(client_id, tenant_id, outlook_accounts)
+
+    for signin in signins:
+        name = f"outlook:{signin or 'default'}"
+        scheduler.add(
+            name, "OUTLOOK",
+            lambda signin=signin, budget=scheduler.budget("OUTLOOK", name): poll_outlook_account(
+                http, token_manager, signin, mailboxes, ingest.put, budget=budget
+            )
+        )
+        if details:
+            # Messages are labelled with the mailbox they arrived in (the signin's own or a shared one)
+            own = signin or (token_manager.peek(None) or {}).get("id_token_claims", {}).get("preferred_username")
+            for mailbox in [own] + (mailboxes or {}).get(own, []):
+                details.register("OUTLOOK", mailbox, lambda message_id, signin=signin, mailbox=mailbox: open_message(
+                    http, token_manager, signin, mailbox, message_id
+                ))
+
+async def poll_accounts(accounts, outlook_accounts, client_id, tenant_id, mailboxes, ingest, details=None, on_ready=None):
+    """
+    Poll Gmail `accounts` and Outlook `outlook_accounts` (None = no Outlook) until cancelled:
+    coroutines on this loop sharing one HTTP connection pool, woken by one adaptive scheduler
+    (base interval 60s). Runs in the aggregator, or in each poller worker for its shard.
+    `on_ready` is called once every account's sign-in has finished.
+    """
+    from connectors.http_client import create_http_session
+    from connectors.credentials import CredentialManager
+    scheduler = PollScheduler(base_interval=60)
+    # Every account's tokens load / refresh concurrently (each with its own timeout),
+    # then stay fresh in the background
+    credentials = CredentialManager()
+    async with create_http_session() as http:
+        setup = [
+            monitor_account(account, creds["Credentials"], creds["Token"], http, scheduler, ingest, credentials, details)
+            for account, creds in accounts.items()
+        ]
+        if outlook_accounts is not None:
+            setup.append(monitor_outlook(
+                outlook_accounts, client_id, tenant_id, http, scheduler, ingest, credentials,
+                mailboxes=mailboxes, details=details
+            ))
+        # Accounts start polling as soon as their own auth is done
+        scheduler_task = asyncio.create_task(scheduler.run())
+
+        try:
+            with PROFILE.phase("Gmail + Outlook auth (concurrent)"):
+                await asyncio.gather(*setup)
+            if credentials.failed:
+                log_warning(f"⚠ Not monitored this run: {', '.join(credentials.failed)}")
+            if on_ready:
+                on_ready()
+            PROFILE.mark_ready()
+            PROFILE.report()
+            await scheduler_task
+        finally:
+            scheduler_task.cancel()
+            credentials.close()
+
+def run_poller(accounts, outlook_accounts, client_id, tenant_id, mailboxes, channel):
+    """Poller worker process: one shard of the Gmail / Outlook accounts, feeding the aggregator's channel."""
+    asyncio.run(poll_accounts(accounts, outlook_accounts, client_id, tenant_id, mailboxes, channel))
+
+def add_pollers(supervisor, count, accounts, outlook_accounts, client_id, tenant_id, mailboxes, channel):
+    """
+    Shard the accounts over `count` poller workers, balanced by mailboxes polled. Gmail accounts
+    spread freely; every Outlook signin stays in one shard because they share one MSAL token
+    cache file (outlooktoken.json), which must only have one writer.
+    """
+    units = [(account, 1) for account in accounts]
+    units.append((None, max(1, sum(1 + len(mailboxes.get(signin, [])) for signin in outlook_accounts))))
+    for i, keys in enumerate(shard(units, count)):
+        if not keys:
+            continue
+        shard_accounts = {account: accounts[account] for account in keys if account is not None}
+        shard_outlook = outlook_accounts if None in keys else None
+        supervisor.add(f"poller-{i}", run_poller, shard_accounts, shard_outlook, client_id, tenant_id, mailboxes, channel)
+        log_success(f"✅ poller-{i}: {len(shard_accounts)} Gmail{' + Outlook' if shard_outlook is not None else ''}")
+
+def run_telegram(api_id, api_hash, chat_ids, channel, profile=False):
+    with PROFILE.phase("Telegram worker: import connector"):
+        from connectors.telegram_connector import monitor_telegram
+    if profile:
+        name, seconds = PROFILE.phases[-1]
+        log_warning(f"⏱  {name}: {seconds * 1000:.0f}ms")
+    asyncio.run(monitor_telegram(api_id, api_hash, chat_ids, channel=channel))
+
+def load_worker_count():
+    """--workers N or FEED_WORKERS: poller processes for Gmail / Outlook (0 = poll in the aggregator)."""
+    raw = sys.argv[sys.argv.index("--workers") + 1] if "--workers" in sys.argv[:-1] else os.getenv("FEED_WORKERS")
+    try:
+        return max(0, int(raw)) if raw else 0
+    except ValueError:
+        log_error(f"❌ Invalid worker count: {raw}")
+        return 0
+
+def load_render_rate():
+    """Optional FEED_RENDER_RATE: max messages rendered per second (unset = as fast as the terminal allows)."""
+    raw = os.getenv("FEED_RENDER_RATE")
+    try:
+        return float(raw) if raw else None
+    except ValueError:
+        log_error(f"❌ Invalid FEED_RENDER_RATE: {raw}")
+        return None
 
 # ------------------ Gmail / Outlook Setup ------------------
 
@@ -148,8 +254,8 @@ def main_banner():
     console.print(title)
     console.print("A personal feed aggregator that unifies Telegram, Gmail, and Outlook messages in a single terminal log.\n")
     # Info lines
-    info1 = Text("⏱  Gmail updates every 1 minute", style="green")
-    info2 = Text("⏱  Outlook updates every 1 minute", style="blue")
+    info1 = Text("⏱  Gmail updates adaptively (~1 minute, faster when busy)", style="green")
+    info2 = Text("⏱  Outlook updates adaptively (~1 minute, faster when busy)", style="blue")
     info3 = Text("💬 Telegram updates in real-time", style="magenta")
     console.print(info1)
     console.print(info2)
@@ -191,52 +297,168 @@ def check_gmail_settings(accounts):
 
 def check_outlook_settings():
     console = Console()
+    from connectors.outlook_connector import get_cached_outlook_accounts
+
     console.print("\n> Initializing Outlook monitor...", style="bold blue")
-    outlook_email = check_token_and_get_active_email()
-    # Build line to print
-    line = Text()
-    line.append("→ ", style="bright_green")
-    line.append(outlook_email, style="bold white")
-    console.print(line)
-    return outlook_email
+    outlook_accounts = get_cached_outlook_accounts()
+    mailboxes = load_outlook_mailboxes()
+    for outlook_email in outlook_accounts:
+        # Build line to print
+        line = Text()
+        line.append("→ ", style="bright_green")
+        line.append(outlook_email, style="bold white")
+        shared = mailboxes.get(outlook_email, [])
+        if shared:
+            line.append("  ", style="")
+            line.append(f"[+ {', '.join(shared)}]", style="bright_black")
+        console.print(line)
+    if not outlook_accounts:
+        log_warning("⚠ No Outlook account in token cache yet, device login will start.")
+    return outlook_accounts, mailboxes
+
+def load_outlook_mailboxes():
+    """Optional OUTLOOK_MAILBOXES: {"signin@x.com": ["shared@x.com", ...]} extra mailboxes per account."""
+    raw = os.getenv("OUTLOOK_MAILBOXES")
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError as e:
+        log_error(f"❌ Invalid JSON for OUTLOOK_MAILBOXES: {e}")
+        return {}
 
 
-def redo_outlook_token():
-    outlook_cli_id = os.getenv("CLIENT_ID")
-    acquire_token(outlook_cli_id)
+def log_filter_stats(message_filter):
+    stats = message_filter.stats()
+    hits = ", ".join(f"{name}={count}" for name, count in stats["hits"].items() if count)
+    log_warning(
+        f"Filters: {stats['dropped']}/{stats['evaluated']} dropped "
+        f"(avg {stats['avg_eval_us']:.1f}µs/msg){' — ' + hits if hits else ''}"
+    )
 
 # ------------------ Main ------------------
-async def main():
+async def main(channel=None, headless=False, tui=False, supervisor=None, workers=0):
+    """
+    Run the pipeline in this event loop, fed by the workers' `channel` (Telegram) and by the
+    Gmail / Outlook pollers: on this loop, or sharded over `workers` supervised processes.
+    `headless` (--headless) skips the terminal feed: messages only go to the sinks in
+    sinks.json (data/feed/messages.jsonl if there are none).
+    `tui` (--tui) shows the full-screen live view instead of appending to the scrollback.
+    """
     console = Console()
     # Intial set up 
     console.print("Checking environment variables...", style="bold #FFA500")
-    accounts,outlook_cli_id,outlook_ten_id,a,b,c = load_and_check_env()
-    main_banner()
-    check_gmail_settings(accounts)
-    outlook_email = check_outlook_settings()
-
-
-    # Gmail + Outlook tasks
-    tasks = [
-        monitor_account(account, creds["Credentials"], creds["Token"], interval=60)
-        for account, creds in accounts.items()
-    ]
-    tasks.append(monitor_outlook(outlook_email, outlook_cli_id, outlook_ten_id, interval=60))
+    with PROFILE.phase("Environment + settings checks"):
+        accounts,outlook_cli_id,outlook_ten_id,a,b,c = load_and_check_env()
+        if not headless:
+            main_banner()
+        check_gmail_settings(accounts)
+        outlook_accounts, outlook_mailboxes = check_outlook_settings()
+
+
+    details = MessageDetails()
+    with PROFILE.phase("Pipeline (renderer, filters, index, archive)"):
+        # Single renderer for everything this process displays
+        if headless:
+            render_queue = None
+        elif tui:
+            # Message bodies are only downloaded when one is opened (Enter), then cached
+            render_queue = LiveView(details=details)
+        else:
+            render_queue = RenderQueue(rate=load_render_rate())
+        # Structured outputs (JSONL files / line socket / webhook), each with its own buffer
+        sinks = load_sinks()
+        if headless and not sinks:
+            sinks = [JsonlFileSink()]
+            log_warning(f"⚠ Headless without sinks.json: writing messages to {sinks[0].path}")
+        # The live view takes over the screen only after sign-in (browser / device-code prompts)
+        for output in [None if tui else render_queue, *sinks]:
+            if output:
+                output.start()
+        # Every source goes through one filter stage before display
+        message_filter = load_filter()
+        # Everything displayed is also indexed for search.py (written in batches off the event loop)
+        index_writer = IndexWriter()
+        # Raw record of everything ingested, filtered or not (see replay.py)
+        archive_writer = ArchiveWriter()
+        consumers = [output for output in [render_queue, *sinks, index_writer] if output]
+        ingest = Ingest(message_filter, consumers, taps=[archive_writer])
+    pump_task = None
+    if channel:
+        # Worker processes (Telegram, poller shards) feed the same pipeline as one stream
+        pump_task = asyncio.create_task(channel.pump(ingest))
+        QUEUE_DEPTH.set_function(channel.depth, "workers")
+
+    # Metrics: Prometheus text on http://127.0.0.1:<port>/metrics and a periodic stats line
+    if render_queue:
+        QUEUE_DEPTH.set_function(render_queue.depth, "render")
+    for sink in sinks:
+        QUEUE_DEPTH.set_function(sink.depth, f"sink:{sink.name}")
+    QUEUE_DEPTH.set_function(index_writer.queue.qsize, "search_index")
+    QUEUE_DEPTH.set_function(archive_writer.queue.qsize, "archive")
+    metrics_port, stats_interval = load_metrics_settings()
+    with PROFILE.phase("Metrics endpoint"):
+        metrics_runner = await start_metrics_server(metrics_port) if metrics_port else None
+    stats_task = asyncio.create_task(StatsReporter(stats_interval).run()) if stats_interval else None
+
+    if supervisor and workers:
+        add_pollers(supervisor, workers, accounts, outlook_accounts, outlook_cli_id, outlook_ten_id, outlook_mailboxes, channel)
+    supervisor_task = asyncio.create_task(supervisor.run()) if supervisor else None
 
     try:
-        await asyncio.gather(*tasks)
-    except KeyboardInterrupt:
-        log_error("\n🛑 Aggregator stopped by user.", justify="center")
+        if supervisor and workers:
+            if tui:
+                log_warning(f"⚠ Sign-in prompts from poller workers are written to {LOG_FOLDER}")
+                render_queue.start()
+            # Pollers (and their API clients) live in the workers, so opening a message in the
+            # live view shows the fields it arrived with instead of fetching the full body
+            PROFILE.mark_ready()
+            PROFILE.report()
+            await supervisor_task
+        else:
+            await poll_accounts(
+                accounts, outlook_accounts, outlook_cli_id, outlook_ten_id, outlook_mailboxes, ingest, details,
+                on_ready=render_queue.start if tui else None
+            )
+    finally:
+        if supervisor:
+            supervisor_task.cancel()
+            supervisor.stop()
+        if pump_task:
+            pump_task.cancel()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        if render_queue:
+            await render_queue.stop()
+        for sink in sinks:
+            await sink.close()
+        index_writer.close()
+        archive_writer.close()
+        details.close()
+        log_filter_stats(message_filter)
 
 
 ## If token cant be read, just delete token?.json (s) and outlooktoken.json to regen
 if __name__ == "__main__":
     tg_api_id, tg_api_hash, tg_chat_ids = load_tele_env()
 
-    # Telegram process (pushes messages to queue)
-    tg_proc = Process(target=run_telegram, args=(tg_api_id, tg_api_hash, tg_chat_ids))
-    tg_proc.start()
-
-    # Start main asyncio monitors in this terminal
-    asyncio.run(main())
+    # Telegram process (pushes messages into the aggregator's event channel), restarted if it dies
+    # (it imports telethon itself; this process never loads it). One Telegram session file
+    # can only be used by one client, so all chats stay in this one worker.
+    with PROFILE.phase("Telegram process start"):
+        tui = "--tui" in sys.argv
+        # The full-screen view owns the terminal: worker output goes to data/logs/<worker>.log
+        supervisor = Supervisor(log_folder=LOG_FOLDER if tui else None)
+        channel = EventChannel(context=supervisor.context)
+        supervisor.add("telegram", run_telegram, tg_api_id, tg_api_hash, tg_chat_ids, channel, PROFILE.enabled)
+        supervisor.start()
+
+    # Start main asyncio monitors + the single renderer in this terminal (or only the sinks with --headless)
+    try:
+        asyncio.run(main(
+            channel, headless="--headless" in sys.argv, tui=tui,
+            supervisor=supervisor, workers=load_worker_count()
+        ))
+    except KeyboardInterrupt:
+        log_error("\n🛑 Aggregator stopped by user.")
 
@@ -0,0 +1,61 @@
+import asyncio
+from storage.detail_cache import DetailCache, load_spill_folder
+
+
+def detail_key(message):
+    return f"{message.source}:{message.account or message.chat_id}:{message.message_id}"
+
+
+def local_detail(message):
+    """Detail built from the FeedMessage alone (Telegram messages already carry their full text)."""
+    return {
+        "subject": message.subject,
+        "from": message.sender,
+        "to": None,
+        "cc": None,
+        "date": message.display_time(),
+        "body": message.text or message.subject or "",
+        "attachments": [],
+    }
+
+
+class MessageDetails:
+    """
+    Opens messages on demand. Pollers only carry metadata; the full body of one message
+    is fetched by ID when it is opened (live view, show.py), through the fetcher each
+    connector registered for its account, and kept in a DetailCache.
+    Concurrent opens of the same message share one request.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or DetailCache(spill_folder=load_spill_folder())
+        self._fetchers = {}   # (source, account) -> async fetch(message_id) -> detail dict
+        self._inflight = {}   # detail key -> task
+
+    def register(self, source, account, fetch):
+        self._fetchers[(source, account)] = fetch
+
+    def can_fetch(self, message):
+        return (message.source, message.account) in self._fetchers
+
+    async def open(self, message):
+        """Detail dict for `message` (cache, then the account's fetcher; local fields if there is none)."""
+        key = detail_key(message)
+        detail = self.cache.get(key)
+        if detail is not None:
+            return detail
+
+        fetch = self._fetchers.get((message.source, message.account))
+        if fetch is None:
+            return local_detail(message)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(fetch(message.message_id))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        detail = await asyncio.shield(task)
+        self.cache.put(key, detail)
+        return detail
+
+    def close(self):
+        self.cache.persist()
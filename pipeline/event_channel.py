@@ -0,0 +1,57 @@
+import queue
+import asyncio
+import multiprocessing
+from display.terminal_display import log_error
+
+# ===== CONFIG =====
+DEFAULT_CAPACITY = 10_000   # events buffered between processes before workers have to wait
+POLL_TIMEOUT = 0.5          # how long the aggregator blocks on an empty channel per read
+
+
+class EventChannel:
+    """
+    Bounded inter-process channel carrying FeedMessage events (pickled, slots only) from
+    worker processes (Telegram, sharded pollers) into the main aggregator.
+
+    Workers `await put(...)`, the same interface as RenderQueue, so a connector does not
+    care whether it renders locally or feeds the aggregator. When the channel is full the
+    worker waits in a helper thread, keeping its event loop responsive (backpressure).
+    The aggregator `pump()`s events into one downstream queue, giving a single ordered stream.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, context=None):
+        self.capacity = capacity
+        # `context` must match the workers' start method (e.g. Supervisor.context)
+        self._queue = (context or multiprocessing).Queue(capacity)
+
+    # ----- worker side -----
+    async def put(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, message)
+
+    # ----- aggregator side -----
+    async def pump(self, downstream):
+        """
+        Forward every event into `downstream` (anything with an async put(message)) until cancelled.
+        A message that fails downstream is logged and dropped; the stream keeps going.
+        """
+        while True:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                try:
+                    message = await asyncio.to_thread(self._queue.get, True, POLL_TIMEOUT)
+                except queue.Empty:
+                    continue
+            try:
+                await downstream.put(message)
+            except Exception as e:
+                log_error(f"❌ Dropped {getattr(message, 'source', '?')} message {getattr(message, 'message_id', '?')}: {e}")
+
+    def depth(self):
+        try:
+            return self._queue.qsize()
+        except NotImplementedError:  # macOS has no sem_getvalue
+            return -1
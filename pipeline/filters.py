@@ -0,0 +1,250 @@
+import os
+import re
+import json
+import time
+from collections import deque
+from pipeline.metrics import FILTER_DROPS
+from display.terminal_display import log_error
+
+# ===== CONFIG =====
+FILTERS_FILE = os.path.join(os.getcwd(), "filters.json")
+
+# Used when there is no filters.json: the old Telegram advert heuristics
+DEFAULT_RULES = [
+    {"name": "tg-empty", "type": "empty", "sources": ["TELEGRAM"]},
+    {"name": "tg-links", "type": "keyword", "patterns": ["http://", "https://", "bit.ly"], "sources": ["TELEGRAM"]},
+    {"name": "tg-long", "type": "max_lines", "value": 5, "sources": ["TELEGRAM"]},
+]
+RULE_TYPES = ("keyword", "sender", "regex", "max_lines", "empty")
+
+
+# ===== MULTI-PATTERN MATCHER =====
+class AhoCorasick:
+    """
+    Case-insensitive multi-keyword matcher: one pass over the text finds every
+    keyword, however many there are. `patterns` is a list of (keyword, rule index).
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+
+        for keyword, rule_index in patterns:
+            state = 0
+            for char in keyword.lower():
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].add(rule_index)
+
+        # Breadth-first failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                if state == 0:
+                    continue  # depth-1 states fail back to the root
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] |= self.output[self.fail[child]]
+
+    def search(self, text):
+        """Set of rule indices whose keywords occur in `text`."""
+        found = set()
+        state = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+# ===== RULES =====
+class FilterRule:
+    __slots__ = ("name", "type", "patterns", "value", "sources", "hits")
+
+    def __init__(self, name, type, patterns=(), value=None, sources=None):
+        self.name = name
+        self.type = type
+        self.patterns = list(patterns)
+        self.value = value
+        self.sources = {s.upper() for s in sources} if sources else None  # None = every source
+        self.hits = 0
+
+    def applies_to(self, service_name):
+        return self.sources is None or service_name in self.sources
+
+
+class CompiledRules:
+    """Every rule that applies to one source, compiled into a handful of matchers."""
+
+    def __init__(self, rules):
+        self.keywords = AhoCorasick(
+            [(p, i) for i, rule in rules for p in rule.patterns if rule.type == "keyword"]
+        )
+        self.has_keywords = any(rule.type == "keyword" for _, rule in rules)
+
+        # Each pattern compiled on its own, so inline flags and backreferences keep their meaning
+        self.regexes = [
+            (re.compile(p, re.IGNORECASE), i)
+            for i, rule in rules if rule.type == "regex" for p in rule.patterns
+        ]
+
+        # Exact sender names / addresses and @domains
+        self.senders = {}
+        self.domains = {}
+        for i, rule in rules:
+            if rule.type == "sender":
+                for p in rule.patterns:
+                    target = self.domains if p.startswith("@") else self.senders
+                    target[p.lower()] = i
+
+        self.empty = [i for i, rule in rules if rule.type == "empty"]
+        self.max_lines = [(i, rule.value) for i, rule in rules if rule.type == "max_lines"]
+
+    def match(self, text, sender_name, sender_address):
+        """Index of the first rule that matches, or None."""
+        if not text and self.empty:
+            return self.empty[0]
+
+        if self.senders or self.domains:
+            for candidate in (sender_name, sender_address):
+                if candidate and candidate.lower() in self.senders:
+                    return self.senders[candidate.lower()]
+            if sender_address and "@" in sender_address:
+                domain = sender_address[sender_address.index("@"):].lower()
+                if domain in self.domains:
+                    return self.domains[domain]
+
+        if text:
+            if self.has_keywords:
+                found = self.keywords.search(text)
+                if found:
+                    return min(found)
+            for regex, i in self.regexes:
+                if regex.search(text):
+                    return i
+            for i, limit in self.max_lines:
+                if text.count("\n") > limit:
+                    return i
+        return None
+
+
+class MessageFilter:
+    """
+    Drop stage every message passes through before display. Rules are compiled once
+    per source into a single keyword automaton, hash lookups and precompiled regexes,
+    so keyword and sender rules cost about the same however many there are.
+    Tracks per-rule hits and total evaluation time.
+    """
+
+    def __init__(self, rules):
+        self.rules = [FilterRule(**rule) for rule in rules]
+        self._compiled = {}
+        self.evaluated = 0
+        self.dropped = 0
+        self.eval_ns = 0
+
+    def _rules_for(self, service_name):
+        compiled = self._compiled.get(service_name)
+        if compiled is None:
+            applicable = [(i, rule) for i, rule in enumerate(self.rules) if rule.applies_to(service_name)]
+            compiled = self._compiled[service_name] = CompiledRules(applicable)
+        return compiled
+
+    def should_drop(self, message):
+        start = time.perf_counter_ns()
+        text = "\n".join(filter(None, (message.subject, message.text)))
+        hit = self._rules_for(message.source).match(text, message.sender_name, message.sender_address)
+
+        self.evaluated += 1
+        self.eval_ns += time.perf_counter_ns() - start
+        if hit is None:
+            return False
+        self.rules[hit].hits += 1
+        self.dropped += 1
+        FILTER_DROPS.inc(message.source, self.rules[hit].name)
+        return True
+
+    def stats(self):
+        return {
+            "evaluated": self.evaluated,
+            "dropped": self.dropped,
+            "avg_eval_us": (self.eval_ns / self.evaluated / 1000) if self.evaluated else 0.0,
+            "hits": {rule.name: rule.hits for rule in self.rules},
+        }
+
+
+def is_string_list(value):
+    """A non-empty list of non-empty strings (a bare string would be split into characters)."""
+    return isinstance(value, list) and bool(value) and all(isinstance(item, str) and item for item in value)
+
+
+def rule_problem(rule):
+    """Why `rule` cannot be used, or None if it is fine."""
+    if not isinstance(rule, dict):
+        return "not an object"
+    if not isinstance(rule.get("name"), str) or not rule["name"]:
+        return "missing name"
+    if rule.get("type") not in RULE_TYPES:
+        return f"unknown type {rule.get('type')!r} (expected {' | '.join(RULE_TYPES)})"
+    unknown = set(rule) - {"name", "type", "patterns", "value", "sources"}
+    if unknown:
+        return f"unknown field(s) {', '.join(sorted(unknown))}"
+    if rule["type"] in ("keyword", "sender", "regex") and not is_string_list(rule.get("patterns")):
+        return "patterns must be a non-empty list of non-empty strings"
+    if rule["type"] == "max_lines" and (type(rule.get("value")) is not int or rule["value"] < 0):
+        return "max_lines needs an integer value >= 0"
+    if "sources" in rule and not is_string_list(rule["sources"]):
+        return "sources must be a non-empty list of non-empty strings"
+    return None
+
+
+def validate_rules(rules):
+    """Rules that can be used as given; a bad rule or regex pattern is logged and skipped."""
+    valid = []
+    for rule in rules:
+        problem = rule_problem(rule)
+        if problem:
+            name = rule.get("name") if isinstance(rule, dict) else None
+            log_error(f"❌ Filter rule {name or '?'}: {problem}, skipped")
+            continue
+        if rule["type"] == "regex":
+            patterns = []
+            for pattern in rule["patterns"]:
+                try:
+                    re.compile(pattern, re.IGNORECASE)
+                    patterns.append(pattern)
+                except re.error as e:
+                    log_error(f"❌ Filter rule {rule['name']}: invalid regex {pattern!r} ({e}), skipped")
+            if not patterns:
+                continue
+            rule = {**rule, "patterns": patterns}
+        valid.append(rule)
+    return valid
+
+
+def load_filter(path=FILTERS_FILE):
+    """
+    Build the filter from filters.json ({"rules": [{"name", "type", "patterns"/"value", "sources"}]}),
+    where type is keyword | sender | regex | max_lines | empty. Falls back to DEFAULT_RULES.
+    Invalid rules are reported and skipped at startup, so they never fail on a message.
+    """
+    if not os.path.exists(path):
+        return MessageFilter(DEFAULT_RULES)
+    with open(path, "r") as f:
+        rules = json.load(f).get("rules", [])
+    if not isinstance(rules, list):
+        log_error("❌ filters.json: \"rules\" must be a list, no filters applied")
+        rules = []
+    return MessageFilter(validate_rules(rules))
@@ -0,0 +1,24 @@
+from pipeline.metrics import INGESTED
+
+
+class Ingest:
+    """
+    Single entry point every connector feeds (directly, or via the EventChannel pump).
+    Messages go through the filter stage once, then fan out to each consumer
+    (anything with an async put(message), e.g. the RenderQueue). Messages are FeedMessage records.
+    Taps take the same put(message) but see every message before filtering (e.g. the archive).
+    """
+
+    def __init__(self, message_filter=None, consumers=(), taps=()):
+        self.message_filter = message_filter
+        self.consumers = list(consumers)
+        self.taps = list(taps)
+
+    async def put(self, message):
+        INGESTED.inc(message.source, message.account or message.chat_id)
+        for tap in self.taps:
+            await tap.put(message)
+        if self.message_filter and self.message_filter.should_drop(message):
+            return
+        for consumer in self.consumers:
+            await consumer.put(message)
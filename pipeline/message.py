@@ -0,0 +1,75 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+
+SENDER_PATTERN = re.compile(r'^(?P<name>.*?)\s*<(?P<email>[^>]+)>$')
+EMAIL_SOURCES = ("GMAIL", "OUTLOOK")
+SENDER_CACHE_SIZE = 4096  # distinct raw "From" strings remembered (senders repeat a lot)
+
+
+@lru_cache(maxsize=SENDER_CACHE_SIZE)
+def parse_sender(raw):
+    """Split 'Name <address>' into (name, address); a bare address becomes (address, address)."""
+    raw = (raw or "").strip()
+    m = SENDER_PATTERN.match(raw)
+    if m:
+        address = m.group("email").strip()
+        return m.group("name").strip().strip('"') or address, address
+    if "@" in raw:
+        return raw, raw
+    return raw or "Unknown", None
+
+
+class FeedMessage:
+    """
+    One normalized message, built once by the connector at ingestion and shared by
+    every later stage (dedup, filters, sinks, display). `__slots__` keeps buffered
+    messages small; the sender is already split and the timestamp is epoch seconds.
+    """
+
+    __slots__ = (
+        "source", "account", "message_id", "sender_name", "sender_address",
+        "subject", "text", "chat_id", "timestamp",
+    )
+
+    def __init__(self, source, message_id, sender_name, sender_address=None, subject=None,
+                 text=None, account=None, chat_id=None, timestamp=0.0):
+        self.source = source                  # "GMAIL" / "OUTLOOK" / "TELEGRAM"
+        self.account = account                # mailbox the message arrived in (email sources)
+        self.message_id = message_id          # provider ID, used for dedup
+        self.sender_name = sender_name
+        self.sender_address = sender_address  # email address, None for Telegram
+        self.subject = subject
+        self.text = text                      # Gmail snippet / Telegram message body
+        self.chat_id = chat_id
+        self.timestamp = timestamp            # epoch seconds
+
+    @classmethod
+    def from_raw_sender(cls, source, message_id, raw_sender, **fields):
+        name, address = parse_sender(raw_sender)
+        return cls(source, message_id, name, address, **fields)
+
+    @property
+    def is_email(self):
+        return self.source in EMAIL_SOURCES
+
+    @property
+    def content(self):
+        return self.subject or self.text or "(No Content)"
+
+    @property
+    def sender(self):
+        return f"{self.sender_name} <{self.sender_address}>" if self.sender_address else self.sender_name
+
+    def display_time(self):
+        return datetime.fromtimestamp(self.timestamp).strftime("%Y-%m-%d %H:%M:%S") if self.timestamp else None
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data.get(field) for field in cls.__slots__ if field in data})
+
+    def __repr__(self):
+        return f"FeedMessage({self.source}, {self.message_id!r}, {self.sender!r}, {self.content[:40]!r})"
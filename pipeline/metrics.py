@@ -0,0 +1,249 @@
+import os
+import bisect
+import asyncio
+import threading
+from display.terminal_display import console, log_warning
+
+# ===== CONFIG =====
+DEFAULT_METRICS_PORT = 9464       # FEED_METRICS_PORT (0 = no endpoint)
+DEFAULT_STATS_INTERVAL = 60       # FEED_STATS_INTERVAL seconds between terminal stats lines (0 = off)
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RENDER_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, extra=()):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ===== METRIC TYPES =====
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()  # may be recorded from worker threads while a scrape reads
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.values = {}  # label values tuple -> count
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def total(self):
+        with self._lock:
+            return sum(self.values.values())
+
+    def samples(self):
+        with self._lock:
+            items = list(self.values.items())
+        return [f"{self.name}{format_labels(self.labelnames, labels)} {value}" for labels, value in items]
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.values = {}
+        self.functions = {}  # label values tuple -> callable read at scrape time
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+    def set_function(self, function, *labels):
+        """Read `function()` whenever the gauge is collected (e.g. a queue's depth)."""
+        self.functions[labels] = function
+
+    def collect(self):
+        values = dict(self.values)
+        for labels, function in self.functions.items():
+            try:
+                values[labels] = function()
+            except Exception:
+                continue
+        return values
+
+    def samples(self):
+        return [f"{self.name}{format_labels(self.labelnames, labels)} {value}" for labels, value in self.collect().items()]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values tuple -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 2)
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def quantile(self, q, *labels):
+        """Bucket upper bound below which `q` of the observations fall (all label sets when none given)."""
+        with self._lock:
+            rows = [list(self.series[labels])] if labels else [list(row) for row in self.series.values()]
+        counts = [sum(row[i] for row in rows) for i in range(len(self.buckets) + 1)]
+        total = sum(counts)
+        if not total:
+            return None
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            if running >= q * total:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self.series.items()]
+        lines = []
+        for labels, series in items:
+            running = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                running += count
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, [('le', bound)])} {running}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {running}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DURATION_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# ===== FEED METRICS =====
+REGISTRY = Registry()
+
+POLL_DURATION = REGISTRY.histogram("feed_poll_duration_seconds", "Duration of one account poll.", ["job"])
+POLL_LAST_DURATION = REGISTRY.gauge("feed_poll_last_duration_seconds", "Duration of the latest poll.", ["job"])
+POLLS = REGISTRY.counter("feed_polls_total", "Account polls by outcome.", ["job", "outcome"])
+POLL_INTERVAL = REGISTRY.gauge("feed_poll_interval_seconds", "Current delay before the next poll.", ["job"])
+POLL_BACKOFFS = REGISTRY.counter("feed_poll_backoffs_total", "Polls that failed and were backed off.", ["job", "error"])
+API_REQUESTS = REGISTRY.counter("feed_api_requests_total", "HTTP requests sent to provider APIs.", ["provider", "account"])
+API_ERRORS = REGISTRY.counter("feed_api_errors_total", "Failed provider API calls (incl. batch items).", ["provider", "account", "status"])
+INGESTED = REGISTRY.counter("feed_messages_ingested_total", "Messages entering the pipeline.", ["source", "origin"])
+DEDUP_HITS = REGISTRY.counter("feed_dedup_hits_total", "Messages skipped as already seen.", ["namespace"])
+FILTER_DROPS = REGISTRY.counter("feed_filter_drops_total", "Messages dropped by filter rules.", ["source", "rule"])
+QUEUE_DEPTH = REGISTRY.gauge("feed_queue_depth", "Messages waiting in a pipeline queue.", ["queue"])
+RENDER_SECONDS = REGISTRY.histogram("feed_render_batch_seconds", "Time to write one batch to the terminal.", buckets=RENDER_BUCKETS)
+RENDERED = REGISTRY.counter("feed_messages_rendered_total", "Messages written to the terminal.")
+WORKERS_UP = REGISTRY.gauge("feed_worker_up", "1 while a worker process is running.", ["worker"])
+WORKER_RESTARTS = REGISTRY.counter("feed_worker_restarts_total", "Worker processes restarted after dying.", ["worker"])
+SINK_MESSAGES = REGISTRY.counter("feed_sink_messages_total", "Messages handled by output sinks by outcome.", ["sink", "outcome"])
+
+
+# ===== HTTP ENDPOINT =====
+async def start_metrics_server(port=DEFAULT_METRICS_PORT, host="127.0.0.1"):
+    """Serve GET /metrics on localhost; returns the aiohttp runner (cleanup() to stop) or None."""
+    from aiohttp import web  # not imported at module level: worker processes record metrics without serving them
+
+    async def metrics(request):
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        log_warning(f"⚠ Metrics endpoint disabled, cannot listen on {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+    return runner
+
+
+# ===== TERMINAL STATS LINE =====
+class StatsReporter:
+    """Prints one summary line per interval with what changed since the previous line."""
+
+    COUNTERS = {"polls": POLLS, "api": API_REQUESTS, "in": INGESTED, "dedup": DEDUP_HITS, "dropped": FILTER_DROPS}
+
+    def __init__(self, interval=DEFAULT_STATS_INTERVAL):
+        self.interval = interval
+        self._last = {key: 0 for key in self.COUNTERS}
+        self._last_errors = 0
+
+    def line(self):
+        totals = {key: counter.total() for key, counter in self.COUNTERS.items()}
+        delta = {key: totals[key] - self._last[key] for key in totals}
+        errors = POLL_BACKOFFS.total()
+        new_errors = errors - self._last_errors
+        self._last, self._last_errors = totals, errors
+
+        parts = [f"polls {delta['polls']}" + (f" ({new_errors} failed)" if new_errors else "")]
+        parts.append(f"api {delta['api']}")
+        parts.append(f"in {delta['in']}")
+        parts.append(f"dedup {delta['dedup']}")
+        parts.append(f"dropped {delta['dropped']}")
+        depths = QUEUE_DEPTH.collect()
+        if depths:
+            parts.append("queues " + " ".join(f"{labels[0]}={depth}" for labels, depth in depths.items()))
+        render_p99 = RENDER_SECONDS.quantile(0.99)
+        if render_p99 is not None:
+            parts.append(f"render p99 ≤{render_p99 * 1000:g}ms")
+        last_durations = POLL_LAST_DURATION.collect()
+        if last_durations:
+            (job,), slowest = max(last_durations.items(), key=lambda item: item[1])
+            parts.append(f"slowest {job} {slowest:.2f}s")
+        return f"📈 last {self.interval}s: " + " · ".join(parts)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            console.print(self.line(), style="bright_black")
+
+
+def load_metrics_settings():
+    """(port, stats interval) from FEED_METRICS_PORT / FEED_STATS_INTERVAL; 0 disables either."""
+    try:
+        port = int(os.getenv("FEED_METRICS_PORT", DEFAULT_METRICS_PORT))
+        interval = int(os.getenv("FEED_STATS_INTERVAL", DEFAULT_STATS_INTERVAL))
+    except ValueError:
+        log_warning("⚠ FEED_METRICS_PORT / FEED_STATS_INTERVAL must be integers, using defaults")
+        return DEFAULT_METRICS_PORT, DEFAULT_STATS_INTERVAL
+    return port, interval
@@ -0,0 +1,185 @@
+import time
+import heapq
+import random
+import asyncio
+from display.terminal_display import log_warning
+from pipeline.metrics import POLL_DURATION, POLL_LAST_DURATION, POLLS, POLL_INTERVAL, POLL_BACKOFFS
+
+# ===== CONFIG =====
+BASE_INTERVAL = 60      # seconds between polls for a freshly added account
+MIN_INTERVAL = 15       # busiest inboxes are never polled faster than this
+MAX_INTERVAL = 600      # idle inboxes drift up to this
+SPEEDUP = 0.5           # interval multiplier after a poll that found new messages
+SLOWDOWN = 1.25         # interval multiplier after an empty poll
+JITTER = 0.2            # +/- fraction applied to every delay
+MAX_BACKOFF = 900       # cap for exponential error backoff
+
+# Per-account budgets (units per second, burst capacity)
+GMAIL_QUOTA_RATE = 250 / 1.0          # Gmail per-user quota: 250 units/sec
+GMAIL_QUOTA_BURST = 250
+GRAPH_REQUEST_RATE = 10_000 / 600.0   # Graph mailbox limit: 10,000 requests / 10 min
+GRAPH_REQUEST_BURST = 100
+
+
+class TokenBucket:
+    """Async token bucket: `await acquire(cost)` waits until `cost` units are available."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, cost=1):
+        cost = min(cost, self.capacity)
+        async with self._lock:  # FIFO: later callers queue behind the one waiting
+            while True:
+                wait = self.blocked_until - time.monotonic()
+                if wait <= 0:
+                    self._refill()
+                    if self.tokens >= cost:
+                        self.tokens -= cost
+                        return
+                    wait = (cost - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+    def block(self, seconds):
+        """Stop handing out units for `seconds` (throttling, e.g. Retry-After)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class PollJob:
+    def __init__(self, name, provider, poll, interval):
+        self.name = name
+        self.provider = provider
+        self.poll = poll          # async () -> number of new messages
+        self.interval = interval  # adaptive, between the scheduler's min and max interval
+        self.failures = 0
+        self.next_run = 0.0
+        self.running = False
+
+    def __lt__(self, other):
+        return self.next_run < other.next_run
+
+
+class PollScheduler:
+    """
+    Central scheduler for every polled account.
+
+    - Each job's interval adapts to activity: polls that find mail halve it, empty
+      polls stretch it, within [MIN_INTERVAL, MAX_INTERVAL].
+    - Every delay is jittered and first polls are staggered, so accounts do not wake in lockstep.
+    - Errors back off exponentially (honouring `retry_after` on the exception, if any);
+      a throttling error also pauses that account's budget.
+    - Connectors spend from a TokenBucket per account (`budget(provider, job name)`), since
+      Gmail's quota is per user and Graph's per mailbox: one throttled account never stalls the rest.
+    """
+
+    def __init__(self, base_interval=BASE_INTERVAL, budgets=None, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        # provider -> (rate, burst) of each account's bucket; a provider left out is not metered
+        self.limits = budgets if budgets is not None else {
+            "GMAIL": (GMAIL_QUOTA_RATE, GMAIL_QUOTA_BURST),
+            "OUTLOOK": (GRAPH_REQUEST_RATE, GRAPH_REQUEST_BURST),
+        }
+        self.budgets = {}  # (provider, job name) -> TokenBucket
+        self.jobs = {}
+        self._heap = []
+        self._tasks = set()
+        self._wakeup = asyncio.Event()
+
+    def budget(self, provider, name):
+        """The TokenBucket of job `name` (created on first use), or None if `provider` is not metered."""
+        limits = self.limits.get(provider)
+        if limits is None:
+            return None
+        bucket = self.budgets.get((provider, name))
+        if bucket is None:
+            bucket = self.budgets[(provider, name)] = TokenBucket(*limits)
+        return bucket
+
+    def add(self, name, provider, poll, interval=None):
+        job = PollJob(name, provider, poll, interval or self.base_interval)
+        # Stagger first polls over the first interval
+        job.next_run = time.monotonic() + random.uniform(0, min(job.interval, 10))
+        self.jobs[name] = job
+        heapq.heappush(self._heap, job)
+        self._wakeup.set()
+        return job
+
+    def _jitter(self, delay):
+        return delay * random.uniform(1 - JITTER, 1 + JITTER)
+
+    async def run(self):
+        """Run due polls until cancelled; polls still in flight are cancelled with it."""
+        try:
+            while True:
+                now = time.monotonic()
+                while self._heap and self._heap[0].next_run <= now:
+                    job = heapq.heappop(self._heap)
+                    job.running = True
+                    task = asyncio.create_task(self._run_job(job))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+                timeout = self._heap[0].next_run - now if self._heap else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run_job(self, job):
+        started = time.monotonic()
+        try:
+            new_count = await job.poll()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            delay = self._on_error(job, e)
+            POLLS.inc(job.name, "error")
+        else:
+            delay = self._on_success(job, new_count or 0)
+            POLLS.inc(job.name, "ok")
+        duration = time.monotonic() - started
+        POLL_DURATION.observe(duration, job.name)
+        POLL_LAST_DURATION.set(duration, job.name)
+
+        job.running = False
+        delay = self._jitter(delay)
+        POLL_INTERVAL.set(delay, job.name)
+        job.next_run = time.monotonic() + delay
+        heapq.heappush(self._heap, job)
+        self._wakeup.set()
+
+    def _on_success(self, job, new_count):
+        job.failures = 0
+        factor = SPEEDUP if new_count else SLOWDOWN
+        job.interval = min(self.max_interval, max(self.min_interval, job.interval * factor))
+        return job.interval
+
+    def _on_error(self, job, error):
+        job.failures += 1
+        delay = min(MAX_BACKOFF, job.interval * (2 ** job.failures))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            delay = max(delay, retry_after)
+            budget = self.budgets.get((job.provider, job.name))
+            if budget:
+                budget.block(retry_after)
+        POLL_BACKOFFS.inc(job.name, type(error).__name__)
+        log_warning(f"⚠ {job.name}: {error} (retry {job.failures} in ~{int(delay)}s)")
+        return delay
@@ -0,0 +1,273 @@
+import os
+import json
+import asyncio
+from storage.dedup_store import DATA_FOLDER
+from pipeline.metrics import SINK_MESSAGES
+from display.terminal_display import log_success, log_warning
+
+# ===== CONFIG =====
+SINKS_FILE = os.path.join(os.getcwd(), "sinks.json")
+DEFAULT_JSONL_PATH = os.path.join(DATA_FOLDER, "feed", "messages.jsonl")
+DEFAULT_BUFFER = 10_000        # messages a sink buffers before it starts dropping new ones
+RETRY_DELAY = 1.0              # seconds before re-sending a failed batch (doubles)
+MAX_RETRY_DELAY = 60.0
+CLOSE_TIMEOUT = 5.0            # seconds each sink gets to flush what is buffered on shutdown
+
+
+def encode_line(message):
+    return json.dumps(message.to_dict(), separators=(",", ":"), ensure_ascii=False) + "\n"
+
+
+# ===== BASE =====
+class Sink:
+    """
+    One output for filtered messages (an Ingest consumer, like the RenderQueue).
+    `put` never waits: each sink has its own bounded buffer and drops new messages when
+    it is full, so a slow or dead sink never stalls ingestion or the other sinks.
+    A background task flushes a batch once `batch_size` messages are waiting or
+    `flush_interval` seconds after the first one arrived; a failed batch is retried with backoff.
+    Subclasses implement `async write(batch)` (and optionally `async aclose()`).
+    """
+
+    kind = "sink"
+
+    def __init__(self, name=None, buffer=DEFAULT_BUFFER, batch_size=100, flush_interval=1.0):
+        self.name = name or self.kind
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = asyncio.Queue(buffer)
+        self.written = 0
+        self.dropped = 0
+        self._task = None
+        self._inflight = None  # batch being delivered (re-sent on close if interrupted)
+        self._failing = False
+
+    async def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            if not self.dropped:
+                log_warning(f"⚠ Sink {self.name} is behind; new messages are being dropped")
+            self.dropped += 1
+            SINK_MESSAGES.inc(self.name, "dropped")
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._inflight = batch
+            await self._deliver(batch)
+            self._inflight = None
+
+    async def _deliver(self, batch):
+        delay = RETRY_DELAY
+        while True:
+            try:
+                await self.write(batch)
+            except Exception as e:
+                if not self._failing:
+                    log_warning(f"⚠ Sink {self.name} failed ({type(e).__name__}: {e}); retrying, buffering up to {self.queue.maxsize}")
+                    self._failing = True
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            if self._failing:
+                log_success(f"✅ Sink {self.name} recovered")
+                self._failing = False
+            self.written += len(batch)
+            SINK_MESSAGES.inc(self.name, "written", amount=len(batch))
+            return
+
+    async def write(self, batch):
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+    def depth(self):
+        return self.queue.qsize()
+
+    async def close(self, timeout=CLOSE_TIMEOUT):
+        """Stop the flush task, then make one last attempt (bounded by `timeout`) to write what is buffered."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        pending = list(self._inflight or [])
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        try:
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                await asyncio.wait_for(self.write(batch), timeout)
+                self.written += len(batch)
+        except Exception as e:
+            log_warning(f"⚠ Sink {self.name}: {len(pending) - start} buffered messages not written on shutdown ({type(e).__name__})")
+        finally:
+            await self.aclose()
+
+
+# ===== JSON LINES FILES =====
+class JsonlFileSink(Sink):
+    """Appends one JSON object per line; rotates messages.jsonl -> .1 -> .2 ... at `max_bytes`."""
+
+    kind = "jsonl"
+
+    def __init__(self, path=DEFAULT_JSONL_PATH, max_bytes=64 * 1024 * 1024, backups=5, **options):
+        options.setdefault("batch_size", 500)
+        super().__init__(**options)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = None
+
+    async def write(self, batch):
+        data = "".join(encode_line(message) for message in batch).encode("utf-8")
+        await asyncio.to_thread(self._append, data)
+
+    def _append(self, data):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "ab")
+        if self.max_bytes and self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
+
+    async def aclose(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+# ===== LINE SOCKET =====
+class SocketSink(Sink):
+    """
+    Streams JSON lines to a local collector (fluent-bit, vector, `nc -lk`, ...).
+    `address` is "unix:/path/to.sock" or "tcp:host:port"; reconnects after any error.
+    """
+
+    kind = "socket"
+
+    def __init__(self, address, **options):
+        options.setdefault("flush_interval", 0.2)
+        super().__init__(**options)
+        self.address = address
+        self._writer = None
+
+    async def _connect(self):
+        scheme, _, target = self.address.partition(":")
+        if scheme == "unix":
+            _, writer = await asyncio.open_unix_connection(target)
+        elif scheme == "tcp":
+            host, _, port = target.rpartition(":")
+            _, writer = await asyncio.open_connection(host or "127.0.0.1", int(port))
+        else:
+            raise ValueError(f"Unknown socket address {self.address!r} (use unix:/path or tcp:host:port)")
+        return writer
+
+    async def write(self, batch):
+        if self._writer is None:
+            self._writer = await self._connect()
+        try:
+            self._writer.write("".join(encode_line(message) for message in batch).encode("utf-8"))
+            await self._writer.drain()
+        except Exception:
+            await self.aclose()
+            raise
+
+    async def aclose(self):
+        if self._writer:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            self._writer = None
+
+
+# ===== WEBHOOK =====
+class WebhookSink(Sink):
+    """POSTs batches as {"messages": [...]} JSON; any non-2xx response is retried."""
+
+    kind = "webhook"
+
+    def __init__(self, url, headers=None, timeout=10, **options):
+        options.setdefault("flush_interval", 5.0)
+        super().__init__(**options)
+        self.url = url
+        self.headers = headers or {}
+        self.timeout = timeout
+        self._session = None
+
+    async def write(self, batch):
+        if self._session is None:
+            import aiohttp
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        payload = {"messages": [message.to_dict() for message in batch]}
+        async with self._session.post(self.url, json=payload, headers=self.headers) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"HTTP {response.status}")
+
+    async def aclose(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+
+# ===== CONFIG FILE =====
+SINK_TYPES = {sink.kind: sink for sink in (JsonlFileSink, SocketSink, WebhookSink)}
+
+
+def load_sinks(path=SINKS_FILE):
+    """
+    Build sinks from sinks.json ({"sinks": [{"type": "jsonl" | "socket" | "webhook", ...options}]}).
+    Common options: name, buffer, batch_size, flush_interval. Returns [] without the file.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        specs = json.load(f).get("sinks", [])
+
+    sinks = []
+    for spec in specs:
+        options = dict(spec)
+        kind = options.pop("type", None)
+        if kind not in SINK_TYPES:
+            log_warning(f"⚠ Unknown sink type {kind!r} in {os.path.basename(path)}, skipped")
+            continue
+        same_kind = sum(1 for sink in sinks if sink.kind == kind)
+        options.setdefault("name", f"{kind}-{same_kind + 1}" if same_kind else kind)
+        sinks.append(SINK_TYPES[kind](**options))
+    return sinks
@@ -0,0 +1,108 @@
+import sys
+import time
+import builtins
+from contextlib import contextmanager
+
+PROCESS_STARTED = time.perf_counter()
+
+
+class ImportTimer:
+    """
+    Times every import that loads a new module, attributing self time (minus nested
+    new imports) to its top-level package, e.g. "google", "msal", "telethon", "rich".
+    """
+
+    def __init__(self):
+        self.times = {}
+        self._stack = []
+        self._original = None
+
+    def install(self):
+        if self._original:
+            return
+        self._original = original = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            started = time.perf_counter()
+            self._stack.append(0.0)
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                elapsed = time.perf_counter() - started
+                nested = self._stack.pop()
+                package = name.partition(".")[0]
+                self.times[package] = self.times.get(package, 0.0) + elapsed - nested
+                if self._stack:
+                    self._stack[-1] += elapsed
+
+        builtins.__import__ = timed_import
+
+    def uninstall(self):
+        if self._original:
+            builtins.__import__ = self._original
+            self._original = None
+
+
+class StartupProfile:
+    """
+    Named startup phases (`with PROFILE.phase("..."):`) plus, when enabled, the import
+    breakdown. Phases are always cheap to record; nothing is printed unless enabled.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.imports = ImportTimer()
+        self.phases = []  # (name, seconds)
+        self.ready_at = None
+
+    def enable(self):
+        self.enabled = True
+        self.imports.install()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def mark_ready(self):
+        """Startup is over (every poller registered); stop timing imports."""
+        self.ready_at = time.perf_counter()
+        self.imports.uninstall()
+
+    def report(self, top=12):
+        if not self.enabled:
+            return
+        from rich.table import Table
+        from display.terminal_display import console
+
+        imports = Table(title="Imports (self time by package)")
+        imports.add_column("package")
+        imports.add_column("ms", justify="right")
+        ranked = sorted(self.imports.times.items(), key=lambda item: item[1], reverse=True)
+        for package, seconds in ranked[:top]:
+            imports.add_row(package, f"{seconds * 1000:.1f}")
+        rest = sum(seconds for _, seconds in ranked[top:])
+        if rest:
+            imports.add_row(f"({len(ranked) - top} others)", f"{rest * 1000:.1f}")
+
+        phases = Table(title="Startup phases")
+        phases.add_column("phase")
+        phases.add_column("ms", justify="right")
+        for name, seconds in self.phases:
+            phases.add_row(name, f"{seconds * 1000:.1f}")
+
+        console.print(imports, phases)
+        total = (self.ready_at or time.perf_counter()) - PROCESS_STARTED
+        console.print(
+            f"⏱  Ready in {total * 1000:.0f}ms "
+            f"(imports {sum(self.imports.times.values()) * 1000:.0f}ms, counted from the first import in main.py)",
+            style="bold cyan"
+        )
+
+
+PROFILE = StartupProfile()
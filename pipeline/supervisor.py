@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import multiprocessing
+from display.terminal_display import log_error, log_warning
+from pipeline.metrics import WORKERS_UP, WORKER_RESTARTS
+from storage.dedup_store import DATA_FOLDER
+
+# ===== CONFIG =====
+CHECK_INTERVAL = 1.0    # seconds between liveness checks
+MIN_BACKOFF = 1.0       # first restart delay after a crash (doubles per crash)
+MAX_BACKOFF = 60.0
+STABLE_AFTER = 60.0     # a worker that ran this long is healthy again (backoff resets)
+STOP_TIMEOUT = 5.0      # seconds workers get to exit before they are killed
+LOG_FOLDER = os.path.join(DATA_FOLDER, "logs")  # worker output while the terminal is not theirs (--tui)
+
+
+def shard(units, count):
+    """
+    Split (key, weight) units into `count` shards, heaviest first onto the least loaded shard.
+    The result only depends on the units, so the same config always gives the same shards.
+    """
+    shards = [[] for _ in range(max(1, count))]
+    loads = [0] * len(shards)
+    for key, weight in sorted(units, key=lambda unit: (-unit[1], str(unit[0]))):
+        target = loads.index(min(loads))
+        shards[target].append(key)
+        loads[target] += weight
+    return shards
+
+
+def redirect_output(path):
+    """Point this process's stdout / stderr (file descriptors included) at the log file `path`."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(fd, 1)
+    os.dup2(fd, 2)
+    os.close(fd)
+    os.environ["NO_COLOR"] = "1"  # consoles created from now on
+    from display.terminal_display import console
+    console.no_color = True
+
+
+def exit_on_signal(signum, frame):
+    """Leave through SystemExit so atexit hooks (dedup store / Bloom filter flush) still run."""
+    sys.exit(128 + signum)
+
+
+def run_worker(target, args, log_path=None):
+    """
+    Worker process entry: Ctrl+C goes to the aggregator only, which stops its workers itself.
+    SIGTERM from Supervisor.stop() exits cleanly instead of killing the process outright.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, exit_on_signal)
+    if log_path:
+        redirect_output(log_path)
+    target(*args)
+
+
+class Worker:
+    def __init__(self, name, target, args):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+
+
+class Supervisor:
+    """
+    Runs worker processes (Telegram, sharded Gmail / Outlook pollers) and keeps them up:
+    a worker that dies is restarted with exponential backoff (reset once it has stayed up
+    for STABLE_AFTER seconds); one that exits cleanly (code 0) is left stopped.
+    Workers all push into one EventChannel, which the aggregator pumps as a single stream.
+    Uses the "spawn" start method everywhere, so workers never inherit the aggregator's
+    threads (index / archive writers) or event loop; the channel must come from `context`.
+    With `log_folder` (the full-screen view owns the terminal), each worker's output goes
+    to <log_folder>/<name>.log instead of the terminal.
+    """
+
+    def __init__(self, min_backoff=MIN_BACKOFF, max_backoff=MAX_BACKOFF, stable_after=STABLE_AFTER, log_folder=None):
+        self.context = multiprocessing.get_context("spawn")
+        self.log_folder = log_folder
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.workers = []
+        self._stopping = False
+
+    def add(self, name, target, *args):
+        self.workers.append(Worker(name, target, args))
+
+    def _start(self, worker):
+        log_path = os.path.join(self.log_folder, f"{worker.name}.log") if self.log_folder else None
+        worker.process = self.context.Process(
+            target=run_worker, args=(worker.target, worker.args, log_path), name=worker.name, daemon=True
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        WORKERS_UP.set(1, worker.name)
+
+    def start(self):
+        """Start the workers added so far (so they can boot while the aggregator is still setting up)."""
+        for worker in self.workers:
+            if worker.process is None:
+                self._start(worker)
+
+    async def _watch(self, worker):
+        delay = self.min_backoff
+        if worker.process is None:
+            self._start(worker)
+        while True:
+            while worker.process.is_alive():
+                await asyncio.sleep(CHECK_INTERVAL)
+            WORKERS_UP.set(0, worker.name)
+            if self._stopping:
+                return
+            code = worker.process.exitcode
+            if code == 0:
+                log_warning(f"⚠ Worker {worker.name} finished")
+                return
+
+            uptime = time.monotonic() - worker.started_at
+            if uptime >= self.stable_after:
+                delay = self.min_backoff
+            worker.restarts += 1
+            WORKER_RESTARTS.inc(worker.name)
+            log_error(f"❌ Worker {worker.name} died (exit code {code}) after {uptime:.0f}s, restarting in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+            if self._stopping:
+                return
+            self._start(worker)
+
+    async def run(self):
+        """Start any worker not started yet and supervise them all until cancelled."""
+        await asyncio.gather(*(self._watch(worker) for worker in self.workers))
+
+    def stop(self):
+        self._stopping = True
+        for worker in self.workers:
+            if worker.process and worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for worker in self.workers:
+            if worker.process:
+                worker.process.join(max(0.0, deadline - time.monotonic()))
+                if worker.process.is_alive():
+                    worker.process.kill()
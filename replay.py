@@ -0,0 +1,73 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+from search import parse_time
+from storage.archive import ARCHIVE_FOLDER, read_archive, replay
+from display.render_queue import RenderQueue
+from display.terminal_display import log_warning
+from pipeline.filters import load_filter
+from pipeline.ingest import Ingest
+
+
+class JsonLinesSink:
+    """Writes each replayed message as one JSON line on stdout (for piping into other tools)."""
+
+    async def put(self, message):
+        sys.stdout.write(json.dumps(message.to_dict(), ensure_ascii=False) + "\n")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Replay messages from the intra-feed archive.")
+    parser.add_argument("--since", type=parse_time, help="archived at or after (YYYY-MM-DD[THH:MM] or 12h / 7d)")
+    parser.add_argument("--until", type=parse_time, help="archived before")
+    parser.add_argument("--source", choices=["gmail", "outlook", "telegram"], type=str.lower)
+    parser.add_argument("--speed", type=float, default=60.0, help="time acceleration (default 60x)")
+    parser.add_argument("--max-speed", action="store_true", help="no delays, replay as fast as possible")
+    parser.add_argument("--filter", action="store_true", help="re-apply the current filters.json rules")
+    parser.add_argument("--json", action="store_true", help="write JSON lines to stdout instead of the feed display")
+    parser.add_argument("--archive", default=ARCHIVE_FOLDER, help="archive folder (default: data/archive)")
+    return parser
+
+
+async def main():
+    args = build_parser().parse_args()
+
+    records = read_archive(args.archive, args.since, args.until)
+    if args.source:
+        records = ((at, m) for at, m in records if m.source == args.source.upper())
+
+    render_queue = None
+    if args.json:
+        sink = JsonLinesSink()
+    else:
+        render_queue = RenderQueue()
+        render_queue.start()
+        sink = render_queue
+    message_filter = load_filter() if args.filter else None
+    ingest = Ingest(message_filter, [sink])
+
+    start = time.perf_counter()
+    try:
+        count = await replay(records, ingest, speed=None if args.max_speed else args.speed)
+        if render_queue:
+            await render_queue.drain()
+    finally:
+        if render_queue:
+            await render_queue.stop()
+
+    summary = f"Replayed {count} message(s) in {time.perf_counter() - start:.1f}s"
+    if message_filter:
+        summary += f", {message_filter.dropped} dropped by filters"
+    if args.json:
+        print(summary, file=sys.stderr)
+    else:
+        log_warning(summary)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,59 @@
+import re
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+from storage.search_index import SearchIndex, INDEX_DB_FILE
+from display.terminal_display import console, display_message, log_error, log_warning
+
+RELATIVE_TIME = re.compile(r"^(\d+)([mhdw])$")
+UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_time(value):
+    """Epoch seconds from an ISO date/datetime ("2024-05-01", "2024-05-01T09:30") or an age ("12h", "7d")."""
+    m = RELATIVE_TIME.match(value)
+    if m:
+        return time.time() - int(m.group(1)) * UNIT_SECONDS[m.group(2)]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time: {value!r} (use YYYY-MM-DD[THH:MM] or e.g. 12h, 7d)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Search messages received by intra-feed.")
+    parser.add_argument("query", nargs="?", help='full-text query, e.g. invoice, "project update", deploy*')
+    parser.add_argument("--sender", help="sender name or address")
+    parser.add_argument("--source", choices=["gmail", "outlook", "telegram"], type=str.lower)
+    parser.add_argument("--account", help="mailbox the message arrived in")
+    parser.add_argument("--since", type=parse_time, help="oldest message time (YYYY-MM-DD[THH:MM] or 12h / 7d / 2w)")
+    parser.add_argument("--until", type=parse_time, help="newest message time (exclusive)")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--ids", action="store_true", help="print each message ID (open one with show.py)")
+    parser.add_argument("--db", default=INDEX_DB_FILE, help="index file (default: data/search_index.db)")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    index = SearchIndex(args.db)
+    start = time.perf_counter()
+    try:
+        results = index.search(args.query, args.sender, args.source, args.account, args.since, args.until, args.limit)
+    except sqlite3.OperationalError as e:
+        log_error(f"❌ Invalid query: {e}")
+        return
+    finally:
+        index.close()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for message in reversed(results):  # oldest first, like the live feed
+        display_message(message)
+        if args.ids:
+            console.print(f"   id: {message.message_id}", style="bright_black")
+    log_warning(f"{len(results)} result(s) in {elapsed_ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
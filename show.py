@@ -0,0 +1,116 @@
+import os
+import json
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from rich.text import Text
+from storage.search_index import SearchIndex, INDEX_DB_FILE
+from storage.detail_cache import DetailCache, load_spill_folder
+from pipeline.details import MessageDetails, detail_key
+from pipeline.message import FeedMessage
+from display.terminal_display import console, display_message, log_error, log_warning
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Open one message received by intra-feed (full body, fetched on demand).")
+    parser.add_argument("message_id", help="provider message ID (python search.py ... --ids)")
+    parser.add_argument("--source", choices=["gmail", "outlook", "telegram"], type=str.lower)
+    parser.add_argument("--account", help="mailbox, if the ID is not in the search index")
+    parser.add_argument("--db", default=INDEX_DB_FILE, help="index file (default: data/search_index.db)")
+    parser.add_argument("--cache", default=load_spill_folder(),
+                        help="detail cache folder (default: FEED_DETAIL_CACHE, unset = keep nothing on disk)")
+    return parser
+
+
+def find_message(args):
+    index = SearchIndex(args.db)
+    try:
+        matches = index.find(args.message_id, args.source)
+    finally:
+        index.close()
+    if args.account:
+        matches = [m for m in matches if m.account == args.account]
+    if matches:
+        return matches[0]
+    if args.source and args.account:  # not indexed (yet), open it from the given coordinates
+        return FeedMessage(args.source.upper(), args.message_id, "", account=args.account)
+    return None
+
+
+async def register_fetcher(details, message, http):
+    """Authenticate only the account this message belongs to."""
+    from connectors.credentials import CredentialManager
+    credentials = CredentialManager()
+
+    if message.source == "GMAIL":
+        from connectors.gmail_connector import GmailClient
+        account = json.loads(os.getenv("GMAIL_ACCOUNTS") or "{}").get(message.account)
+        if not account:
+            log_warning(f"⚠ {message.account} is not in GMAIL_ACCOUNTS")
+            return
+        creds = await credentials.gmail(message.account, account["Credentials"], account["Token"], keep_fresh=False)
+        if creds:
+            client = GmailClient(http, creds, account["Token"], message.account)
+            details.register("GMAIL", message.account, client.get_message_detail)
+
+    elif message.source == "OUTLOOK":
+        from connectors.outlook_connector import get_cached_outlook_accounts, open_message
+        mailboxes = json.loads(os.getenv("OUTLOOK_MAILBOXES") or "{}")
+        signin = message.account if message.account in get_cached_outlook_accounts() else next(
+            (owner for owner, shared in mailboxes.items() if message.account in shared), None
+        )
+        token_manager, signins = await credentials.outlook(os.getenv("CLIENT_ID"), os.getenv("TENANT_ID"), [signin] if signin else [])
+        if signins:
+            details.register("OUTLOOK", message.account, lambda message_id: open_message(
+                http, token_manager, signin, message.account, message_id
+            ))
+        if token_manager:
+            token_manager.close()
+
+
+def print_detail(message, detail):
+    if message.sender_name:
+        display_message(message)
+    for label in ("from", "to", "cc", "date", "subject"):
+        if detail.get(label):
+            line = Text(f"{label.title():>8}: ", style="bold bright_magenta")
+            line.append(str(detail[label]))
+            console.print(line)
+    if detail.get("attachments"):
+        console.print(" 📎 " + ", ".join(detail["attachments"]), style="yellow")
+    console.print()
+    console.print(Text(detail.get("body") or "(empty)"))
+
+
+async def main():
+    load_dotenv()  # first: FEED_DETAIL_CACHE sets the --cache default
+    args = build_parser().parse_args()
+
+    message = find_message(args)
+    if message is None:
+        log_error(f"❌ Message {args.message_id} is not in the search index (pass --source and --account to open it anyway)")
+        return
+
+    details = MessageDetails(DetailCache(spill_folder=args.cache))
+    detail = details.cache.get(detail_key(message))
+    if detail is None and message.source != "TELEGRAM":
+        from connectors.http_client import create_http_session
+        async with create_http_session() as http:
+            await register_fetcher(details, message, http)
+            if not details.can_fetch(message):
+                log_error(f"❌ No credentials to open {message.source} messages for {message.account}")
+                return
+            try:
+                detail = await details.open(message)
+            except Exception as e:
+                log_error(f"❌ Could not fetch message: {e}")
+                return
+        details.close()  # spill to disk (if enabled), so opening it again is instant
+    elif detail is None:
+        detail = await details.open(message)
+
+    print_detail(message, detail)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,237 @@
+import os
+import re
+import json
+import mmap
+import time
+import zlib
+import queue
+import struct
+import asyncio
+import threading
+from storage.dedup_store import DATA_FOLDER
+from pipeline.message import FeedMessage
+from display.terminal_display import log_warning
+
+# ===== CONFIG =====
+ARCHIVE_FOLDER = os.path.join(DATA_FOLDER, "archive")
+SEGMENT_BYTES = 64 * 1024 * 1024   # rotate after this many bytes...
+SEGMENT_SECONDS = 24 * 3600        # ...or once a segment is this old
+RETENTION_DAYS = 30                # segments older than this are deleted when a segment opens
+RETENTION_BYTES = 2 * 1024 ** 3    # oldest segments go first once the archive is bigger than this
+FSYNC_INTERVAL = 5.0               # seconds between fsyncs (batches are flushed to the OS every write)
+WRITE_QUEUE_SIZE = 50_000
+
+# Segment = MAGIC, then records of: payload length, CRC32 of payload, archive time, compact JSON payload
+MAGIC = b"IFARCH1\n"
+RECORD_HEADER = struct.Struct("<IId")
+SEGMENT_NAME = re.compile(r"^(\d{8})-(\d+)\.seg$")
+
+
+def segment_name(seq, started):
+    return f"{seq:08d}-{int(started)}.seg"
+
+
+def list_segments(folder=ARCHIVE_FOLDER):
+    """[(seq, started, path)] oldest first."""
+    if not os.path.isdir(folder):
+        return []
+    segments = []
+    for name in os.listdir(folder):
+        m = SEGMENT_NAME.match(name)
+        if m:
+            segments.append((int(m.group(1)), int(m.group(2)), os.path.join(folder, name)))
+    return sorted(segments)
+
+
+def encode_record(message, archived_at):
+    payload = json.dumps(message.to_dict(), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload), archived_at) + payload
+
+
+# ===== WRITER =====
+class ArchiveWriter:
+    """
+    Append-only archive of every ingested message (recorded before filtering, so it
+    can be replayed through different rules later). Like the search index writer,
+    `put` only enqueues; a background thread appends batches to the current segment,
+    rotates by size/age and applies retention.
+    A new segment is started on every run, so a torn tail from a crash is never appended to.
+    """
+
+    def __init__(self, folder=ARCHIVE_FOLDER, segment_bytes=SEGMENT_BYTES, segment_seconds=SEGMENT_SECONDS,
+                 retention_days=RETENTION_DAYS, retention_bytes=RETENTION_BYTES):
+        self.folder = folder
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_days * 86400 if retention_days else None
+        self.retention_bytes = retention_bytes
+        self.queue = queue.Queue(WRITE_QUEUE_SIZE)
+        self.archived = 0
+        self.dropped = 0
+        os.makedirs(folder, exist_ok=True)
+
+        self._file = None
+        self._seq = max((seq for seq, _, _ in list_segments(folder)), default=0)
+        self._thread = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+        self._thread.start()
+
+    async def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            if not self.dropped:
+                log_warning("⚠ Archive writer is behind; messages are not being archived")
+            self.dropped += 1
+
+    # ------------------ Segments ------------------
+    def _open_segment(self, now):
+        self._seq += 1
+        path = os.path.join(self.folder, segment_name(self._seq, now))
+        self._file = open(path, "ab")
+        self._file.write(MAGIC)
+        self._file.flush()
+        self._segment_started = now
+        self._segment_size = len(MAGIC)
+        # Every run opens a segment, so retention also applies to installs that restart daily
+        self._apply_retention(now)
+
+    def _close_segment(self):
+        if self._file:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def _should_rotate(self, now):
+        return (self._segment_size >= self.segment_bytes
+                or now - self._segment_started >= self.segment_seconds)
+
+    def _apply_retention(self, now):
+        """Delete whole closed segments past the age or size limit (never the open one)."""
+        segments = list_segments(self.folder)[:-1]
+        total = sum(os.path.getsize(path) for _, _, path in segments)
+        for _, _, path in segments:
+            # Judged by its last write: closed segments are never appended to again
+            too_old = self.retention_seconds and os.path.getmtime(path) < now - self.retention_seconds
+            too_big = self.retention_bytes and total > self.retention_bytes
+            if not (too_old or too_big):
+                break
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+    def _write(self, batch):
+        now = time.time()
+        if self._file is None:
+            self._open_segment(now)
+        elif self._should_rotate(now):
+            self._close_segment()
+            self._open_segment(now)
+
+        data = b"".join(encode_record(message, now) for message in batch)
+        self._file.write(data)
+        self._file.flush()
+        self._segment_size += len(data)
+        self.archived += len(batch)
+
+    def _run(self):
+        last_sync = time.monotonic()
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self.queue.get(timeout=FSYNC_INTERVAL)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < 1000:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:  # close() sentinel
+                stopping = True
+                batch = [m for m in batch if m is not None]
+            try:
+                if batch:
+                    self._write(batch)
+                if self._file and time.monotonic() - last_sync >= FSYNC_INTERVAL:
+                    os.fsync(self._file.fileno())
+                    last_sync = time.monotonic()
+            except OSError as e:
+                log_warning(f"⚠ Archive write failed: {e}")
+        self._close_segment()
+
+    def close(self, timeout=5):
+        """
+        Write what is queued, fsync and stop the writer thread.
+        Gives up after `timeout` seconds (a stuck writer is reported), so exit never hangs.
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            log_warning("⚠ Archive writer queue is still full at exit; unwritten messages are lost")
+            return
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        if self._thread.is_alive():
+            log_warning(f"⚠ Archive writer did not finish within {timeout}s; unwritten messages are lost")
+
+
+# ===== READER =====
+def read_segment(path):
+    """
+    Yield (archived_at, message) from one segment through a read-only mmap.
+    Stops quietly at a truncated or corrupt record (e.g. the tail of a crashed run).
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= len(MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(MAGIC)] != MAGIC:
+                log_warning(f"⚠ Not an archive segment: {path}")
+                return
+            offset = len(MAGIC)
+            while offset + RECORD_HEADER.size <= size:
+                length, crc, archived_at = RECORD_HEADER.unpack_from(mm, offset)
+                start = offset + RECORD_HEADER.size
+                payload = mm[start:start + length]
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    log_warning(f"⚠ {os.path.basename(path)}: corrupt or truncated record at byte {offset}, skipping rest")
+                    return
+                yield archived_at, FeedMessage.from_dict(json.loads(payload))
+                offset = start + length
+
+
+def read_archive(folder=ARCHIVE_FOLDER, since=None, until=None):
+    """Yield (archived_at, message) oldest first, skipping segments outside [since, until)."""
+    segments = list_segments(folder)
+    for i, (_, started, path) in enumerate(segments):
+        next_started = segments[i + 1][1] if i + 1 < len(segments) else None
+        if since is not None and next_started is not None and next_started <= since:
+            continue
+        if until is not None and started >= until:
+            break
+        for archived_at, message in read_segment(path):
+            if since is not None and archived_at < since:
+                continue
+            if until is not None and archived_at >= until:
+                return
+            yield archived_at, message
+
+
+async def replay(records, sink, speed=60.0):
+    """
+    Feed archived (archived_at, message) records into `sink.put`, keeping their original
+    spacing divided by `speed` (speed=None or 0: as fast as the sink accepts). Returns the count.
+    """
+    count = 0
+    first_archived = first_wall = None
+    for archived_at, message in records:
+        if speed:
+            if first_archived is None:
+                first_archived, first_wall = archived_at, time.monotonic()
+            delay = (archived_at - first_archived) / speed - (time.monotonic() - first_wall)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await sink.put(message)
+        count += 1
+    return count
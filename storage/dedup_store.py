@@ -0,0 +1,252 @@
+import os
+import math
+import atexit
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from pipeline.metrics import DEDUP_HITS
+
+# ===== CONFIG =====
+DATA_FOLDER = os.path.join(os.getcwd(), "data")
+STATE_DB_FILE = os.path.join(DATA_FOLDER, "feed_state.db")
+
+DEFAULT_TTL = 30 * 24 * 3600        # forget seen IDs after 30 days
+DEFAULT_MAX_ENTRIES = 50_000        # on-disk cap per namespace (oldest evicted first)
+DEFAULT_MEMORY_ENTRIES = 20_000     # in-memory LRU in front of the database
+PRUNE_EVERY = 1_000                 # run eviction after this many inserts
+BLOOM_CHECKPOINT = "bloom:shared"   # the one Bloom filter every probabilistic namespace shares
+
+
+# ===== PROBABILISTIC SET =====
+class BloomFilter:
+    """
+    Fixed-size set membership with no false negatives and a tunable false positive rate.
+    Memory is sized once from `capacity` and never grows.
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001, bits=None):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits else bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+# ===== DEDUP / CHECKPOINT STORE =====
+class NamespaceView:
+    """Set-like view (`in` / `add`) over one namespace, so connectors can use it like a set."""
+
+    def __init__(self, store, namespace):
+        self.store = store
+        self.namespace = namespace
+
+    def __contains__(self, key):
+        if self.store.is_seen(self.namespace, key):
+            DEDUP_HITS.inc(self.namespace)
+            return True
+        return False
+
+    def add(self, key):
+        self.store.mark_seen(self.namespace, key)
+
+
+class DedupStore:
+    """
+    Seen-ID and checkpoint store shared by all connectors, backed by SQLite.
+
+    - Lookups hit an in-memory LRU first (O(1)), then the primary-key index on disk.
+    - Entries expire after `ttl` seconds and each namespace is capped at `max_entries`.
+    - Namespaces starting with one of `probabilistic_prefixes` are kept in a Bloom filter
+      instead of rows, for chats where volume would make exact tracking too large. All of them
+      share one filter (keys are prefixed with the namespace), so memory is sized once from
+      `bloom_capacity` however many chats there are; it is only written back when it changed.
+    """
+
+    def __init__(self, path=STATE_DB_FILE, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 memory_entries=DEFAULT_MEMORY_ENTRIES, probabilistic_prefixes=(),
+                 bloom_capacity=1_000_000, bloom_error_rate=0.001):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.probabilistic_prefixes = tuple(probabilistic_prefixes)
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+
+        self._lock = threading.Lock()  # callers share one event loop today; keeps the store safe across threads
+        self._lru = OrderedDict()
+        self._bloom_filter = None
+        self._bloom_dirty = False
+        self._inserts = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")  # Telegram runs in another process
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS seen (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                seen_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS seen_by_age ON seen (namespace, seen_at);
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                namespace TEXT PRIMARY KEY,
+                value BLOB,
+                updated_at REAL NOT NULL
+            );
+        """)
+        # Older versions kept one filter per chat; they are superseded by the shared one
+        self._db.execute("DELETE FROM checkpoints WHERE namespace LIKE 'bloom:%' AND namespace != ?", (BLOOM_CHECKPOINT,))
+
+    # ----- seen IDs -----
+    def _is_probabilistic(self, namespace):
+        return bool(self.probabilistic_prefixes) and namespace.startswith(self.probabilistic_prefixes)
+
+    def _bloom(self):
+        if self._bloom_filter is None:
+            row = self._db.execute(
+                "SELECT value FROM checkpoints WHERE namespace = ?", (BLOOM_CHECKPOINT,)
+            ).fetchone()
+            bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+            if row and len(row[0]) == len(bloom.bits):  # ignore a filter saved with another size
+                bloom.bits = bytearray(row[0])
+            self._bloom_filter = bloom
+        return self._bloom_filter
+
+    def _remember(self, entry, seen_at):
+        self._lru[entry] = seen_at
+        self._lru.move_to_end(entry)
+        if len(self._lru) > self.memory_entries:
+            self._lru.popitem(last=False)
+
+    def is_seen(self, namespace, key):
+        key = str(key)
+        with self._lock:
+            if self._is_probabilistic(namespace):
+                return f"{namespace}\0{key}" in self._bloom()
+
+            entry = (namespace, key)
+            seen_at = self._lru.get(entry)
+            if seen_at is None:
+                row = self._db.execute(
+                    "SELECT seen_at FROM seen WHERE namespace = ? AND key = ?", entry
+                ).fetchone()
+                if row is None:
+                    return False
+                seen_at = row[0]
+            if time.time() - seen_at > self.ttl:
+                self._lru.pop(entry, None)
+                return False
+            self._remember(entry, seen_at)
+            return True
+
+    def mark_seen(self, namespace, key):
+        key = str(key)
+        now = time.time()
+        with self._lock:
+            if self._is_probabilistic(namespace):
+                self._bloom().add(f"{namespace}\0{key}")
+                self._bloom_dirty = True
+            else:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO seen (namespace, key, seen_at) VALUES (?, ?, ?)",
+                    (namespace, key, now)
+                )
+                self._remember((namespace, key), now)
+
+            self._inserts += 1
+            if self._inserts % PRUNE_EVERY == 0:
+                self._prune_locked()
+
+    def check_and_mark(self, namespace, key):
+        """Return True if `key` is new in `namespace` (and record it), False if already seen."""
+        if self.is_seen(namespace, key):
+            DEDUP_HITS.inc(namespace)
+            return False
+        self.mark_seen(namespace, key)
+        return True
+
+    def view(self, namespace):
+        return NamespaceView(self, namespace)
+
+    # ----- checkpoints -----
+    def get_checkpoint(self, namespace, default=None):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM checkpoints WHERE namespace = ?", (namespace,)
+            ).fetchone()
+        return row[0] if row else default
+
+    def set_checkpoint(self, namespace, value):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints (namespace, value, updated_at) VALUES (?, ?, ?)",
+                (namespace, value, time.time())
+            )
+
+    # ----- eviction / persistence -----
+    def _prune_locked(self):
+        cutoff = time.time() - self.ttl
+        self._db.execute("DELETE FROM seen WHERE seen_at < ?", (cutoff,))
+        for (namespace,) in self._db.execute(
+            "SELECT namespace FROM seen GROUP BY namespace HAVING COUNT(*) > ?", (self.max_entries,)
+        ).fetchall():
+            self._db.execute(
+                """DELETE FROM seen WHERE namespace = ? AND key IN (
+                       SELECT key FROM seen WHERE namespace = ?
+                       ORDER BY seen_at DESC LIMIT -1 OFFSET ?)""",
+                (namespace, namespace, self.max_entries)
+            )
+        self._flush_blooms_locked()
+
+    def _flush_blooms_locked(self):
+        if not self._bloom_dirty:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO checkpoints (namespace, value, updated_at) VALUES (?, ?, ?)",
+            (BLOOM_CHECKPOINT, bytes(self._bloom_filter.bits), time.time())
+        )
+        self._bloom_dirty = False
+
+    def prune(self):
+        with self._lock:
+            self._prune_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_blooms_locked()
+            self._db.close()
+
+
+# ===== SHARED INSTANCE =====
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """
+    Process-wide store. Set FEED_DEDUP_MODE=bloom to track Telegram chats
+    probabilistically in one shared filter (~1.8 MB for 1M IDs, whatever the chat count); FEED_STATE_DB overrides the file
+    (e.g. a scratch database for benchmarks).
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            prefixes = ("telegram:",) if os.getenv("FEED_DEDUP_MODE", "exact").lower() == "bloom" else ()
+            _store = DedupStore(os.getenv("FEED_STATE_DB", STATE_DB_FILE), probabilistic_prefixes=prefixes)
+            atexit.register(_store.close)
+        return _store
@@ -0,0 +1,133 @@
+import os
+import json
+import zlib
+import hashlib
+from collections import OrderedDict
+from storage.dedup_store import DATA_FOLDER
+
+# ===== CONFIG =====
+DETAILS_FOLDER = os.path.join(DATA_FOLDER, "details")  # spill folder when FEED_DETAIL_CACHE=1
+MEMORY_BYTES = 16 * 1024 * 1024     # message bodies kept in memory (LRU, by encoded size)
+SPILL_BYTES = 256 * 1024 * 1024     # compressed bodies kept on disk; oldest files go first
+SPILL_SUFFIX = ".json.z"
+
+
+def load_spill_folder():
+    """
+    Optional FEED_DETAIL_CACHE: "1" spills to data/details, any other value is the folder to use.
+    Unset (default) keeps opened bodies in memory only, so no mail content is written to disk.
+    """
+    raw = os.getenv("FEED_DETAIL_CACHE", "").strip()
+    if raw.lower() in ("", "0", "false", "no"):
+        return None
+    return DETAILS_FOLDER if raw.lower() in ("1", "true", "yes") else raw
+
+
+class DetailCache:
+    """
+    Size-bounded LRU of opened message details (body, recipients, attachment names), keyed by
+    "SOURCE:account:message_id". Entries evicted from memory are spilled to `spill_folder`
+    as zlib-compressed JSON (only if given; bodies are unencrypted), so reopening an older message
+    still skips the API.
+    The spill folder is trimmed by file age once it grows past `spill_bytes`.
+    """
+
+    def __init__(self, max_bytes=MEMORY_BYTES, spill_folder=None, spill_bytes=SPILL_BYTES):
+        self.max_bytes = max_bytes
+        self.spill_folder = spill_folder
+        self.spill_bytes = spill_bytes
+        self._entries = OrderedDict()   # key -> (detail, encoded size)
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        detail = self._load_spilled(key)
+        if detail is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self.put(key, detail)
+        return detail
+
+    def put(self, key, detail):
+        """Cache `detail` in memory, spilling the least recently used entries past `max_bytes`."""
+        if key in self._entries:
+            self.size -= self._entries.pop(key)[1]
+        encoded = json.dumps(detail, ensure_ascii=False).encode("utf-8")
+        self._entries[key] = (detail, len(encoded))
+        self.size += len(encoded)
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            old_key, (old_detail, old_size) = self._entries.popitem(last=False)
+            self.size -= old_size
+            if not os.path.exists(self._spill_path(old_key) or ""):
+                self._spill(old_key, old_detail)
+
+    # ----- disk spill -----
+    def _spill_path(self, key):
+        if not self.spill_folder:
+            return None
+        return os.path.join(self.spill_folder, hashlib.sha1(key.encode("utf-8")).hexdigest() + SPILL_SUFFIX)
+
+    def _spill(self, key, detail, trim=True):
+        path = self._spill_path(key)
+        if not path:
+            return
+        os.makedirs(self.spill_folder, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(zlib.compress(json.dumps({"key": key, "detail": detail}, ensure_ascii=False).encode("utf-8")))
+        if trim:
+            self._trim_spill()
+
+    def _load_spilled(self, key):
+        path = self._spill_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                record = json.loads(zlib.decompress(f.read()))
+        except (OSError, zlib.error, ValueError):
+            return None
+        if record.get("key") != key:  # hash collision
+            return None
+        os.utime(path)  # keep recently read files the longest
+        return record["detail"]
+
+    def _trim_spill(self):
+        files = []
+        for name in os.listdir(self.spill_folder):
+            if name.endswith(SPILL_SUFFIX):
+                stat = os.stat(os.path.join(self.spill_folder, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.spill_bytes:
+                break
+            os.remove(os.path.join(self.spill_folder, name))
+            total -= size
+
+    def persist(self):
+        """Spill everything still in memory (on shutdown, so the next run / show.py finds it on disk)."""
+        if not self.spill_folder:
+            return
+        for key, (detail, _) in self._entries.items():
+            if not os.path.exists(self._spill_path(key)):
+                self._spill(key, detail, trim=False)
+        if os.path.isdir(self.spill_folder):
+            self._trim_spill()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
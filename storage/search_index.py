@@ -0,0 +1,222 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+from storage.dedup_store import DATA_FOLDER
+from pipeline.message import FeedMessage
+from display.terminal_display import log_warning
+
+# ===== CONFIG =====
+INDEX_DB_FILE = os.path.join(DATA_FOLDER, "search_index.db")
+WRITE_BATCH_SIZE = 500      # messages per transaction
+WRITE_INTERVAL = 2.0        # flush at least this often (seconds) when messages are waiting
+WRITE_QUEUE_SIZE = 50_000   # pending messages before new ones are dropped from the index
+
+MESSAGE_COLUMNS = ("source", "account", "message_id", "sender_name", "sender_address",
+                   "subject", "text", "chat_id", "timestamp")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    account TEXT,
+    message_id TEXT NOT NULL,
+    sender_name TEXT,
+    sender_address TEXT,
+    subject TEXT,
+    text TEXT,
+    chat_id INTEGER,
+    timestamp REAL NOT NULL,
+    origin TEXT NOT NULL  -- account, or chat_id as text: never NULL, so it can be part of the unique key
+);
+CREATE INDEX IF NOT EXISTS messages_by_time ON messages (timestamp);
+CREATE INDEX IF NOT EXISTS messages_by_source ON messages (source, timestamp);
+CREATE INDEX IF NOT EXISTS messages_by_account ON messages (account, timestamp);
+CREATE INDEX IF NOT EXISTS messages_by_message_id ON messages (message_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    subject, text, sender_name, sender_address,
+    content='messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, subject, text, sender_name, sender_address)
+    VALUES (new.id, new.subject, new.text, new.sender_name, new.sender_address);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, subject, text, sender_name, sender_address)
+    VALUES ('delete', old.id, old.subject, old.text, old.sender_name, old.sender_address);
+END;
+"""
+
+# Created after the origin migration: SQLite UNIQUE treats NULLs as distinct, so the old
+# (source, account, chat_id, message_id) key never matched anything
+UNIQUE_KEY = "CREATE UNIQUE INDEX IF NOT EXISTS messages_unique ON messages (source, origin, message_id)"
+
+
+def message_origin(message):
+    if message.account:
+        return message.account
+    return str(message.chat_id) if message.chat_id is not None else ""
+
+
+def fts_phrase(value):
+    """Quote user input as an FTS5 phrase so punctuation (@, ., -) is not parsed as syntax."""
+    return '"' + value.replace('"', '""') + '"'
+
+
+class SearchIndex:
+    """Full-text index of received messages (SQLite FTS5, external-content table)."""
+
+    def __init__(self, path=INDEX_DB_FILE):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=10)
+        self.db.execute("PRAGMA journal_mode=WAL")  # search.py reads while the aggregator writes
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._migrate()
+        self.db.execute(UNIQUE_KEY)
+
+    def _migrate(self):
+        """Indexes made before the origin column: fill it in and drop the duplicates it reveals."""
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(messages)")}
+        if "origin" in columns:
+            return
+        with self.db:
+            self.db.execute("ALTER TABLE messages ADD COLUMN origin TEXT")
+            self.db.execute("UPDATE messages SET origin = COALESCE(account, CAST(chat_id AS TEXT), '')")
+            self.db.execute(
+                "DELETE FROM messages WHERE id NOT IN (SELECT MIN(id) FROM messages GROUP BY source, origin, message_id)"
+            )
+
+    def add_many(self, messages):
+        """Insert a batch in one transaction; already indexed messages (same source, origin, ID) are ignored."""
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR IGNORE INTO messages ({', '.join(MESSAGE_COLUMNS)}, origin) "
+                f"VALUES ({', '.join('?' * (len(MESSAGE_COLUMNS) + 1))})",
+                [
+                    tuple(str(m.message_id) if col == "message_id" else getattr(m, col) for col in MESSAGE_COLUMNS)
+                    + (message_origin(m),)
+                    for m in messages
+                ]
+            )
+
+    def search(self, text=None, sender=None, source=None, account=None, since=None, until=None, limit=50):
+        """
+        Newest-first FeedMessages matching every given criterion.
+        `text` uses FTS5 query syntax (words, "phrases", OR, prefix*); `sender` matches
+        name or address tokens; `since` / `until` are epoch seconds.
+        """
+        match_terms = []
+        if text:
+            match_terms.append(f"({text})")
+        if sender:
+            match_terms.append("{sender_name sender_address} : " + fts_phrase(sender))
+
+        where, params = [], []
+        if match_terms:
+            # Subquery, not a join: the planner would otherwise re-run the MATCH per candidate row
+            where.append("m.id IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)")
+            params.append(" AND ".join(match_terms))
+        if source:
+            where.append("m.source = ?")
+            params.append(source.upper())
+        if account:
+            where.append("m.account = ?")
+            params.append(account)
+        if since is not None:
+            where.append("m.timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("m.timestamp < ?")
+            params.append(until)
+
+        sql = f"SELECT {', '.join('m.' + col for col in MESSAGE_COLUMNS)} FROM messages m"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY m.timestamp DESC LIMIT ?"
+        params.append(limit)
+
+        return [FeedMessage(**dict(zip(MESSAGE_COLUMNS, row))) for row in self.db.execute(sql, params)]
+
+    def find(self, message_id, source=None):
+        """Every indexed message with this provider ID (newest first), e.g. for show.py."""
+        sql = f"SELECT {', '.join(MESSAGE_COLUMNS)} FROM messages WHERE message_id = ?"
+        params = [str(message_id)]
+        if source:
+            sql += " AND source = ?"
+            params.append(source.upper())
+        sql += " ORDER BY timestamp DESC"
+        return [FeedMessage(**dict(zip(MESSAGE_COLUMNS, row))) for row in self.db.execute(sql, params)]
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+class IndexWriter:
+    """
+    Ingest consumer that indexes messages off the hot path: `put` only enqueues,
+    a background thread writes batches of up to WRITE_BATCH_SIZE per transaction.
+    """
+
+    def __init__(self, path=INDEX_DB_FILE, batch_size=WRITE_BATCH_SIZE, interval=WRITE_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue = queue.Queue(WRITE_QUEUE_SIZE)
+        self.indexed = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="search-index-writer", daemon=True)
+        self._thread.start()
+
+    async def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            if not self.dropped:
+                log_warning("⚠ Search index writer is behind; messages are not being indexed")
+            self.dropped += 1
+
+    def _run(self):
+        index = SearchIndex(self.path)  # SQLite connections stay on the thread that made them
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self.queue.get(timeout=self.interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:  # close() sentinel
+                stopping = True
+                batch = [m for m in batch if m is not None]
+            if batch:
+                try:
+                    index.add_many(batch)
+                    self.indexed += len(batch)
+                except sqlite3.Error as e:
+                    log_warning(f"⚠ Search index write failed: {e}")
+        index.close()
+
+    def close(self, timeout=5):
+        """
+        Flush what is queued and stop the writer thread.
+        Gives up after `timeout` seconds (a stuck writer is reported), so exit never hangs.
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            log_warning("⚠ Search index writer queue is still full at exit; unwritten messages are lost")
+            return
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        if self._thread.is_alive():
+            log_warning(f"⚠ Search index writer did not finish within {timeout}s; unwritten messages are lost")
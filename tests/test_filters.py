@@ -0,0 +1,59 @@
+import json
+import pytest
+from pipeline.filters import validate_rules, load_filter
+from pipeline.message import FeedMessage
+
+GOOD_KEYWORD = {"name": "links", "type": "keyword", "patterns": ["http://"], "sources": ["TELEGRAM"]}
+
+
+@pytest.mark.parametrize("rule", [
+    "not a rule",
+    {"type": "keyword", "patterns": ["spam"]},                       # no name
+    {"name": "", "type": "keyword", "patterns": ["spam"]},           # empty name
+    {"name": "typo", "type": "kewyord", "patterns": ["spam"]},       # unknown type
+    {"name": "extra", "type": "empty", "pattern": ["spam"]},         # unknown field
+    {"name": "no-value", "type": "max_lines"},
+    {"name": "str-value", "type": "max_lines", "value": "5"},
+    {"name": "bool-value", "type": "max_lines", "value": True},
+    {"name": "negative", "type": "max_lines", "value": -1},
+    {"name": "empty-keyword", "type": "keyword", "patterns": [""]},
+    {"name": "no-patterns", "type": "keyword"},
+    {"name": "empty-list", "type": "sender", "patterns": []},
+    {"name": "str-patterns", "type": "keyword", "patterns": "spam"},
+    {"name": "non-str-pattern", "type": "regex", "patterns": [5]},
+    {"name": "bad-regex", "type": "regex", "patterns": ["[bad"]},
+    {"name": "str-sources", "type": "empty", "sources": "TELEGRAM"},
+    {"name": "empty-sources", "type": "empty", "sources": []},
+    {"name": "empty-source", "type": "empty", "sources": [""]},
+])
+def test_invalid_rule_is_skipped(rule):
+    assert validate_rules([rule, GOOD_KEYWORD]) == [GOOD_KEYWORD]
+
+
+def test_bad_regex_pattern_is_dropped_from_its_rule():
+    rules = validate_rules([{"name": "mixed", "type": "regex", "patterns": ["[bad", "(?i)hello"]}])
+    assert rules == [{"name": "mixed", "type": "regex", "patterns": ["(?i)hello"]}]
+
+
+def test_valid_rules_pass_unchanged():
+    rules = [
+        GOOD_KEYWORD,
+        {"name": "news", "type": "sender", "patterns": ["@news.example.com"]},
+        {"name": "long", "type": "max_lines", "value": 5},
+        {"name": "empty", "type": "empty"},
+    ]
+    assert validate_rules(rules) == rules
+
+
+def test_load_filter_survives_bad_rules(tmp_path):
+    path = tmp_path / "filters.json"
+    path.write_text(json.dumps({"rules": [
+        {"type": "keyword", "patterns": ["x"]},
+        {"name": "long", "type": "max_lines", "value": "5"},
+        {"name": "all", "type": "keyword", "patterns": [""]},
+        {"name": "spam", "type": "keyword", "patterns": ["spam"]},
+    ]}))
+    message_filter = load_filter(str(path))
+    assert [rule.name for rule in message_filter.rules] == ["spam"]
+    assert not message_filter.should_drop(FeedMessage("TELEGRAM", 1, "a", chat_id=1, text="hi\n" * 10))
+    assert message_filter.should_drop(FeedMessage("TELEGRAM", 2, "a", chat_id=1, text="buy spam"))